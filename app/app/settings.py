@@ -1,3 +1,4 @@
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 
@@ -155,6 +156,11 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 MEDIA_ROOT = BASE_DIR / "media/"
 MEDIA_URL = "/media/"
 
+# Files written at runtime (snapshots, caches) are kept outside the source tree,
+# which is bind-mounted into the containers; docker-compose mounts a volume
+# shared by the web and Celery containers here
+RUNTIME_DIR = Path(env.str("RUNTIME_DIR", str(Path(tempfile.gettempdir()) / "shop")))
+
 # Log database queries (for optimization purposes)
 
 if env.bool("LOG_DB_QUERIES", False):
@@ -195,6 +201,10 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Page size of the cursor-paginated list endpoints
+CURSOR_PAGINATION_PAGE_SIZE = env.int("CURSOR_PAGINATION_PAGE_SIZE", 1000)
+CURSOR_PAGINATION_MAX_PAGE_SIZE = env.int("CURSOR_PAGINATION_MAX_PAGE_SIZE", 10000)
+
 
 # SECURITY
 
@@ -251,31 +261,69 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TIME_LIMIT = 60 * 15
 CELERY_TASK_SOFT_TIME_LIMIT = 60 * 10
 
+# Cache
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": f"redis://{REDIS_HOST}:{REDIS_PORT}/1",
+    }
+}
+
+# How often 1C data is synced
+ONEC_SYNC_INTERVAL = timedelta(minutes=env.int("ONEC_SYNC_INTERVAL_MINUTES", 10))
+# A new sync pipeline is skipped while the previous one runs; the lock expires
+# after the three pipeline stages could have hit CELERY_TASK_TIME_LIMIT
+SYNC_PIPELINE_LOCK_TIMEOUT = 3 * CELERY_TASK_TIME_LIMIT
 CELERY_BEAT_SCHEDULE = {
-    "sync-products": {"task": "products.tasks.sync_products", "schedule": 60 * 60 * 24},
-    "sync_price_types": {
-        "task": "products.tasks.sync_price_types",
-        "schedule": 60 * 60 * 24,
-    },
-    "sync_characteristics": {
-        "task": "products.tasks.sync_characteristics",
-        "schedule": 60 * 60 * 24,
-    },
-    "sync_barcodes": {
-        "task": "products.tasks.sync_barcodes",
-        "schedule": 60 * 60 * 24,
-    },
-    "sync_product_movements": {
-        "task": "products.tasks.sync_product_movements",
-        "schedule": 60 * 60 * 24,
-    },
-    "sync_price_changes": {
-        "task": "products.tasks.sync_price_changes",
-        "schedule": 60 * 60 * 24,
+    "sync-pipeline": {
+        "task": "products.tasks.sync_pipeline",
+        "schedule": ONEC_SYNC_INTERVAL,
     },
 }
 
 
 # App settings
 
-ONEC_REQUESTS_TIMEOUT = 90  # in seconds
+ONEC_REQUESTS_TIMEOUT = 90  # read timeout, in seconds
+ONEC_CONNECT_TIMEOUT = env.int("ONEC_CONNECT_TIMEOUT", 5)  # in seconds
+# Failed 1C requests are retried with exponential backoff and jitter (in seconds);
+# after ONEC_CIRCUIT_BREAKER_THRESHOLD failures in a row requests are paused
+# for ONEC_CIRCUIT_BREAKER_TIMEOUT seconds
+ONEC_RETRIES = env.int("ONEC_RETRIES", 3)
+ONEC_RETRY_BACKOFF = 1
+ONEC_RETRY_BACKOFF_MAX = 30
+ONEC_CIRCUIT_BREAKER_THRESHOLD = env.int("ONEC_CIRCUIT_BREAKER_THRESHOLD", 5)
+ONEC_CIRCUIT_BREAKER_TIMEOUT = env.int("ONEC_CIRCUIT_BREAKER_TIMEOUT", 60)
+# On-disk cache of 1C catalog responses revalidated with ETag/Last-Modified
+ONEC_CACHE_DIR = RUNTIME_DIR / "onec-cache"
+# Objects per request when paging through 1C entities with $top and a key filter
+ONEC_PAGE_SIZE = env.int("ONEC_PAGE_SIZE", 5000)
+# Synced objects are written in transactions of at most ONEC_SYNC_CHUNK_SIZE
+# objects, so worker memory does not grow with the size of the 1C entity
+ONEC_SYNC_CHUNK_SIZE = env.int("ONEC_SYNC_CHUNK_SIZE", 5000)
+# Large 1C registers are split into ONEC_FETCH_PARTITIONS Period ranges fetched
+# concurrently by at most ONEC_MAX_WORKERS threads
+ONEC_FETCH_PARTITIONS = env.int("ONEC_FETCH_PARTITIONS", 4)
+ONEC_MAX_WORKERS = env.int("ONEC_MAX_WORKERS", 4)
+# In the sync pipeline each 1C register is split into ONEC_SYNC_SHARDS Period
+# ranges synced by parallel Celery tasks; raise it up to the workers' concurrency
+ONEC_SYNC_SHARDS = env.int("ONEC_SYNC_SHARDS", 4)
+# 1C registers are synced incrementally by Period: records are re-requested
+# ONEC_SYNC_PERIOD_OVERLAP back from the last synced one to catch back-dated
+# postings, and a full reconciliation runs after ONEC_FULL_SYNC_INTERVAL
+ONEC_SYNC_PERIOD_OVERLAP = timedelta(days=env.int("ONEC_SYNC_PERIOD_OVERLAP_DAYS", 1))
+ONEC_FULL_SYNC_INTERVAL = timedelta(days=env.int("ONEC_FULL_SYNC_INTERVAL_DAYS", 1))
+
+# Cached product amounts and prices are invalidated by syncs; the timeout only
+# bounds how long entries of changed products occupy Redis (in seconds)
+PRODUCT_CACHE_TIMEOUT = env.int("PRODUCT_CACHE_TIMEOUT", 60 * 60 * 24)
+
+# Incremental sync-data: how long deletions are kept for clients and how far back
+# a cursor is moved to catch sync transactions committed after it was issued
+SYNC_DATA_TOMBSTONES_TTL = timedelta(days=env.int("SYNC_DATA_TOMBSTONES_TTL_DAYS", 30))
+SYNC_DATA_CURSOR_OVERLAP = timedelta(seconds=CELERY_TASK_TIME_LIMIT)
+# Rows fetched per server-side cursor round trip in the streamed full sync-data
+SYNC_DATA_CHUNK_SIZE = env.int("SYNC_DATA_CHUNK_SIZE", 2000)
+# Gzipped full sync-data snapshot built by Celery after syncs; must be shared
+# between the web and Celery containers
+SYNC_DATA_SNAPSHOT_DIR = RUNTIME_DIR / "sync-data"
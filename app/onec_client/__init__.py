@@ -1 +1,10 @@
-from .client import OneCODataClient
+from .async_client import AsyncOneCODataClient
+from .client import (
+    OneCODataClient,
+    format_odata_datetime,
+    get_period_bounds,
+    get_period_filter,
+    get_period_partitions,
+    parse_odata_datetime,
+)
+from .resilience import CircuitBreakerOpen
@@ -0,0 +1,202 @@
+import asyncio
+import itertools
+from typing import AsyncIterator
+
+import httpx
+from django.conf import settings
+
+from .base import (
+    BaseOneCODataClient,
+    get_key_fields,
+    get_odata_params,
+    get_page_filter,
+    get_page_select,
+)
+from .resilience import get_retry_delay
+
+
+class AsyncOneCODataClient(BaseOneCODataClient):
+    """
+    Асинхронный клиент для взаимодействия с 1c по API.
+
+    Запросы идут через общий пул соединений с keep-alive, одновременно
+    выполняется не больше ``max_concurrency`` запросов. Клиент нужно
+    использовать как асинхронный контекстный менеджер, чтобы закрыть пул.
+    """
+
+    connect_errors = (httpx.ConnectError, httpx.ConnectTimeout)
+
+    def __init__(self, url="", username="", password="", max_concurrency=None):
+        super().__init__(url, username, password)
+
+        max_concurrency = max_concurrency or settings.ONEC_MAX_WORKERS
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.session = httpx.AsyncClient(
+            auth=(self.odata_username.encode(), self.odata_password.encode()),
+            timeout=httpx.Timeout(
+                settings.ONEC_REQUESTS_TIMEOUT, connect=settings.ONEC_CONNECT_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+        )
+
+    async def __aenter__(self) -> "AsyncOneCODataClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.session.aclose()
+
+    async def request(
+        self,
+        method: str,
+        odata_entity: str,
+        params: dict | None = None,
+        data: dict | None = None,
+        odata_format: str = "json",
+        use_cache: bool = False,
+    ) -> dict | str:
+        """
+        Запрос к 1с с повторами, так же как ``OneCODataClient.request``.
+        """
+        url, headers = self.prepare_request(
+            odata_entity, params, odata_format, use_cache
+        )
+
+        for attempt in itertools.count():
+            self.circuit_breaker.before_request()
+            try:
+                async with self.semaphore:
+                    response = await self.session.request(
+                        method, url, json=data, headers=headers
+                    )
+            except httpx.TransportError as error:
+                if not self.should_retry_error(method, error, attempt):
+                    raise
+            else:
+                if not self.should_retry_response(method, response, attempt):
+                    break
+            await asyncio.sleep(get_retry_delay(attempt))
+
+        return self.handle_response(response, url, use_cache)
+
+    async def get(
+        self,
+        odata_entity: str = "",
+        odata_filter: str | None = None,
+        odata_select: str | None = None,
+        odata_expand: str | None = None,
+        odata_count: int = 0,
+        odata_format: str = "json",
+        odata_skip: int = 0,
+        odata_orderby: str | None = None,
+        use_cache: bool = False,
+    ) -> dict:
+        params = get_odata_params(
+            odata_filter=odata_filter,
+            odata_select=odata_select,
+            odata_expand=odata_expand,
+            odata_count=odata_count,
+            odata_skip=odata_skip,
+            odata_orderby=odata_orderby,
+        )
+        return await self.request(
+            "GET",
+            odata_entity,
+            params,
+            odata_format=odata_format,
+            use_cache=use_cache,
+        )
+
+    async def post(
+        self, odata_entity: str, create_data: dict, odata_format: str = "json"
+    ) -> dict:
+        return await self.request(
+            "POST", odata_entity, data=create_data, odata_format=odata_format
+        )
+
+    async def patch(
+        self, odata_entity: str, update_data: dict, odata_format: str = "json"
+    ) -> dict:
+        return await self.request(
+            "PATCH", odata_entity, data=update_data, odata_format=odata_format
+        )
+
+    async def put(
+        self, odata_entity: str, update_data: dict, odata_format: str = "json"
+    ) -> dict:
+        return await self.request(
+            "PUT", odata_entity, data=update_data, odata_format=odata_format
+        )
+
+    async def delete(self, odata_entity: str, odata_format: str = "json") -> dict | str:
+        return await self.request("DELETE", odata_entity, odata_format=odata_format)
+
+    async def iter_pages(
+        self,
+        odata_entity: str,
+        odata_filter: str | None = None,
+        odata_select: str | None = None,
+        odata_expand: str | None = None,
+        odata_orderby: str | None = None,
+        page_size: int | None = None,
+        use_cache: bool = False,
+    ) -> AsyncIterator[list[dict]]:
+        """
+        Перебирает страницы объектов сущности 1с, так же как
+        ``OneCODataClient.iter_pages``.
+        """
+        page_size = page_size or settings.ONEC_PAGE_SIZE
+        key_fields = get_key_fields(odata_orderby)
+        odata_select = get_page_select(odata_select, key_fields)
+        last_object = None
+        while True:
+            response = await self.get(
+                odata_entity,
+                odata_filter=get_page_filter(odata_filter, key_fields, last_object),
+                odata_select=odata_select,
+                odata_expand=odata_expand,
+                odata_count=page_size,
+                odata_orderby=odata_orderby,
+                use_cache=use_cache,
+            )
+            objects_odata = response["value"]
+            yield objects_odata
+            if len(objects_odata) < page_size:
+                return
+            last_object = objects_odata[-1]
+
+    async def get_entities(self, odata_entity: str, **kwargs) -> list[dict]:
+        """
+        Все объекты сущности 1с, запрошенные постранично.
+        """
+        entities = []
+        async for objects_odata in self.iter_pages(odata_entity, **kwargs):
+            entities.extend(objects_odata)
+        return entities
+
+    async def get_entities_partitioned(
+        self,
+        odata_entity: str,
+        partition_filters: list[str | None],
+        odata_filter: str | None = None,
+        **kwargs,
+    ) -> list[dict]:
+        """
+        Все объекты сущности 1с; разделы ``partition_filters`` запрашиваются
+        одновременно, так же как в ``OneCODataClient.iter_entities_partitioned``.
+        """
+        partitions = []
+        for partition_filter in partition_filters:
+            filters = [f"({f})" for f in (odata_filter, partition_filter) if f]
+            partitions.append(
+                self.get_entities(
+                    odata_entity, odata_filter=" and ".join(filters) or None, **kwargs
+                )
+            )
+        return [
+            entity
+            for partition in await asyncio.gather(*partitions)
+            for entity in partition
+        ]
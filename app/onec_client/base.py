@@ -0,0 +1,224 @@
+"""
+Общая часть синхронного и асинхронного клиентов 1с: параметры подключения,
+построение запросов, решение о повторе запроса и разбор ответа.
+"""
+
+import json
+import logging
+import re
+import threading
+from urllib.parse import quote, urlencode
+
+import environ
+from django.conf import settings
+
+from .cache import ResponseCache
+from .resilience import IDEMPOTENT_METHODS, RETRY_STATUS_CODES, CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+env = environ.Env()
+
+# Строковое представление GUID, как 1с отдаёт ключи ссылок
+GUID_RE = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE
+)
+
+
+def get_odata_params(
+    odata_filter: str | None = None,
+    odata_select: str | None = None,
+    odata_expand: str | None = None,
+    odata_count: int = 0,
+    odata_skip: int = 0,
+    odata_orderby: str | None = None,
+) -> dict:
+    """
+    Параметры GET-запроса к 1с.
+    """
+    params = {}
+    if odata_filter is not None:
+        params["$filter"] = odata_filter
+    if odata_select is not None:
+        params["$select"] = odata_select
+    if odata_count > 0:
+        params["$top"] = odata_count
+    if odata_skip > 0:
+        params["$skip"] = odata_skip
+    if odata_orderby is not None:
+        params["$orderby"] = odata_orderby
+    if odata_expand is not None:
+        params["$expand"] = odata_expand
+    return params
+
+
+def format_odata_value(value) -> str:
+    """
+    Литерал значения поля от 1с для ``$filter``.
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if GUID_RE.fullmatch(value):
+        return f"guid'{value}'"
+    return "'{}'".format(value.replace("'", "''"))
+
+
+def get_key_fields(odata_orderby: str | None) -> list[str]:
+    """
+    Поля ключа, по которому перебираются страницы сущности 1с.
+    """
+    if not odata_orderby:
+        raise ValueError("Paging requires odata_orderby by an entity unique key")
+    key_fields = [field.strip() for field in odata_orderby.split(",")]
+    if any(" " in field for field in key_fields):
+        raise ValueError("Paging supports ascending odata_orderby only")
+    return key_fields
+
+
+def get_page_filter(
+    odata_filter: str | None, key_fields: list[str], last_object: dict | None
+) -> str | None:
+    """
+    Фильтр следующей страницы: объекты ``odata_filter`` с ключом больше ключа
+    ``last_object`` — последнего объекта предыдущей страницы.
+    """
+    if last_object is None:
+        return odata_filter
+    # (a, b) > (x, y): a gt x or (a eq x and b gt y)
+    conditions = []
+    for i, field in enumerate(key_fields):
+        terms = [
+            f"{key_field} eq {format_odata_value(last_object[key_field])}"
+            for key_field in key_fields[:i]
+        ]
+        terms.append(f"{field} gt {format_odata_value(last_object[field])}")
+        conditions.append(" and ".join(terms))
+    keyset_filter = " or ".join(f"({condition})" for condition in conditions)
+    filters = [f"({f})" for f in (odata_filter, keyset_filter) if f]
+    return " and ".join(filters)
+
+
+def get_page_select(odata_select: str | None, key_fields: list[str]) -> str | None:
+    """
+    ``$select`` страницы: поля ключа нужны для фильтра следующей страницы.
+    """
+    if odata_select is None:
+        return None
+    fields = odata_select.split(",")
+    return ",".join([*fields, *(f for f in key_fields if f not in fields)])
+
+
+class BaseOneCODataClient:
+    """
+    Основа клиентов 1с. Наследники отправляют запросы своей HTTP-библиотекой
+    и повторяют их по ``should_retry_error`` и ``should_retry_response``.
+    Ответ должен поддерживать ``status_code``, ``content``, ``headers``
+    и ``raise_for_status()``.
+    """
+
+    # Ошибки HTTP-библиотеки наследника, после которых известно, что соединение
+    # с 1с не установилось и запрос не отправлен
+    connect_errors: tuple[type[Exception], ...] = ()
+
+    def __init__(self, url="", username="", password=""):
+        self.odata_url = url or env.str("ONEC_ODATA_URL")
+
+        self.odata_username = username or env.str("ONEC_ODATA_LOGIN")
+        self.odata_password = password or env.str("ONEC_ODATA_PASSWORD")
+
+        params_set = any(
+            bool(x) for x in [self.odata_url, self.odata_username, self.odata_password]
+        )
+        if not params_set:
+            raise ValueError(
+                "Connection params not set! Be sure ONEC_ODATA_URL, ONEC_ODATA_LOGIN "
+                "and ONEC_ODATA_PASSWORD variables are set "
+                "or pass them to client class!"
+            )
+
+        self.odata_url = self.odata_url.rstrip("/")
+
+        self.circuit_breaker = CircuitBreaker()
+        self.cache = ResponseCache()
+        # Объём полученных от 1с данных в байтах, в том числе из потоков
+        self.bytes_received = 0
+        self.bytes_received_lock = threading.Lock()
+
+    def prepare_request(
+        self,
+        odata_entity: str,
+        params: dict | None,
+        odata_format: str,
+        use_cache: bool,
+    ) -> tuple[str, dict[str, str]]:
+        """
+        URL запроса к 1с и заголовки условного запроса для ``use_cache``.
+        """
+        params = {"$format": odata_format, **(params or {})}
+        params_encoded = urlencode(params, quote_via=quote)
+        url = f"{self.odata_url}/{odata_entity}?{params_encoded}"
+        headers = self.cache.get_conditional_headers(url) if use_cache else {}
+        return url, headers
+
+    def is_connect_error(self, error: BaseException | None) -> bool:
+        """
+        Не установилось ли соединение с 1с. ``connect_errors`` ищутся во всей
+        цепочке исключения: HTTP-библиотеки оборачивают ошибки соединения
+        в свои исключения.
+        """
+        while error is not None:
+            if isinstance(error, self.connect_errors):
+                return True
+            error = error.__cause__ or error.__context__
+        return False
+
+    def should_retry_error(self, method: str, error: Exception, attempt: int) -> bool:
+        """
+        Нужно ли повторить запрос после сетевой ошибки или таймаута.
+        Неидемпотентные запросы повторяются, только если соединение
+        не установилось (``is_connect_error``).
+        """
+        self.circuit_breaker.record_failure()
+        retryable = method in IDEMPOTENT_METHODS or self.is_connect_error(error)
+        if not retryable or attempt >= settings.ONEC_RETRIES:
+            return False
+        logger.warning("OneC API request failed: %s, retrying", error)
+        return True
+
+    def should_retry_response(self, method: str, response, attempt: int) -> bool:
+        """
+        Нужно ли повторить запрос после ответа 1с.
+        """
+        if response.status_code not in RETRY_STATUS_CODES:
+            self.circuit_breaker.record_success()
+            return False
+        self.circuit_breaker.record_failure()
+        if method not in IDEMPOTENT_METHODS or attempt >= settings.ONEC_RETRIES:
+            return False
+        logger.warning("OneC API responded with %s, retrying", response.status_code)
+        return True
+
+    def handle_response(self, response, url: str, use_cache: bool) -> dict | str:
+        """
+        Данные из ответа 1с. С ``use_cache`` ответ сохраняется в кэш,
+        а на ``304`` возвращается сохранённый ответ.
+        """
+        logger.info("Got response from OneC API")
+        with self.bytes_received_lock:
+            self.bytes_received += len(response.content)
+
+        if response.status_code == 401:
+            raise PermissionError(
+                "Wrong username or password for OData client provided"
+            )
+        if response.status_code == 304 and use_cache:
+            return json.loads(self.cache.load(url).decode("utf-8-sig"))
+        response.raise_for_status()
+        if use_cache:
+            self.cache.save(url, response.headers, response.content)
+        if response.status_code == 204:
+            return ""
+
+        return json.loads(response.content.decode("utf-8-sig"))
@@ -0,0 +1,71 @@
+"""
+Кэш ответов 1с на диске с проверкой актуальности по ETag и Last-Modified.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+
+class ResponseCache:
+    """
+    Хранит тело ответа на GET-запрос и его валидаторы (``ETag``,
+    ``Last-Modified``) в файлах, названных по хэшу URL. При повторном
+    запросе валидаторы отправляются в ``If-None-Match``/``If-Modified-Since``,
+    и на ответ ``304 Not Modified`` возвращается сохранённое тело.
+    """
+
+    def __init__(self, cache_dir: Path | None = None) -> None:
+        self.cache_dir = Path(cache_dir or settings.ONEC_CACHE_DIR)
+
+    def get_path(self, url: str) -> Path:
+        return self.cache_dir / hashlib.sha256(url.encode()).hexdigest()
+
+    def get_conditional_headers(self, url: str) -> dict[str, str]:
+        """
+        Заголовки условного запроса для URL, если ответ на него сохранён.
+        """
+        try:
+            with open(self.get_path(url).with_suffix(".json")) as f:
+                validators = json.load(f)
+        except FileNotFoundError:
+            return {}
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        return headers
+
+    def load(self, url: str) -> bytes:
+        return self.get_path(url).read_bytes()
+
+    def save(self, url: str, headers, content: bytes) -> None:
+        """
+        Сохраняет ответ, если 1с передала валидаторы, иначе проверить
+        актуальность сохранённого ответа будет нечем.
+        """
+        validators = {
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        }
+        if not any(validators.values()):
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.get_path(url)
+        # Тело записывается раньше валидаторов, поэтому по валидаторам
+        # всегда находится целое тело
+        for file_path, data in (
+            (path, content),
+            (path.with_suffix(".json"), json.dumps(validators).encode()),
+        ):
+            with tempfile.NamedTemporaryFile(
+                dir=self.cache_dir, delete=False
+            ) as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_file.name, file_path)
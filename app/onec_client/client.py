@@ -1,40 +1,164 @@
-import logging
-from urllib.parse import quote, urlencode
+import functools
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterator
 
-import environ
 import requests
+from dateutil import parser
 from django.conf import settings
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
 
-logger = logging.getLogger(__name__)
+from .base import (
+    BaseOneCODataClient,
+    get_key_fields,
+    get_odata_params,
+    get_page_filter,
+    get_page_select,
+)
+from .resilience import get_retry_delay
 
-env = environ.Env()
+# Признак того, что все страницы раздела сущности получены
+PARTITION_DONE = object()
 
 
-class OneCODataClient:
+def format_odata_datetime(value: datetime) -> str:
     """
-    Клиент для взаимодействия с 1c по API.
+    Литерал даты и времени для ``$filter`` 1с в текущем часовом поясе.
     """
+    return f"datetime'{timezone.localtime(value).strftime('%Y-%m-%dT%H:%M:%S')}'"
 
-    def __init__(self, url="", username="", password=""):
-        self.odata_url = url or env.str("ONEC_ODATA_URL")
 
-        self.odata_username = username or env.str("ONEC_ODATA_LOGIN")
-        self.odata_password = password or env.str("ONEC_ODATA_PASSWORD")
+def parse_odata_datetime(value: str) -> datetime:
+    """
+    Время из строки 1с в текущем часовом поясе. Время без часового пояса
+    считается местным, как у ``datetime.astimezone``.
+    """
+    return _parse_odata_datetime(value, timezone.get_current_timezone())
 
-        params_set = any(
-            bool(x) for x in [self.odata_url, self.odata_username, self.odata_password]
-        )
-        if not params_set:
-            raise ValueError(
-                "Connection params not set! Be sure ONEC_ODATA_URL, ONEC_ODATA_LOGIN "
-                "and ONEC_ODATA_PASSWORD variables are set "
-                "or pass them to client class!"
-            )
 
-        self.odata_url = self.odata_url.rstrip("/")
+@functools.lru_cache(maxsize=65536)
+def _parse_odata_datetime(value: str, tz) -> datetime:
+    # 1с отдаёт время в формате ``YYYY-MM-DDTHH:MM:SS``, который разбирает
+    # ``fromisoformat``; остальные форматы разбираются медленным ``dateutil``.
+    # Результат кэшируется: у записей одного документа одинаковое время.
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        parsed = parser.parse(value)
+    return parsed.astimezone(tz)
+
+
+def get_period_bounds(start: datetime, end: datetime, count: int) -> list[datetime]:
+    """
+    Границы ``count`` равных промежутков времени между ``start`` и ``end``
+    с точностью до секунды, как в ``$filter`` 1с.
+    """
+    if count < 2 or start >= end:
+        return []
+    step = (end - start) / count
+    return [(start + step * i).replace(microsecond=0) for i in range(1, count)]
+
+
+def get_period_filter(
+    lower: datetime | None, upper: datetime | None, field: str = "Period"
+) -> str | None:
+    """
+    Фильтр записей с ``field`` в промежутке ``[lower, upper)``; ``None`` —
+    промежуток не ограничен с этой стороны.
+    """
+    filters = []
+    if lower is not None:
+        filters.append(f"{field} ge {format_odata_datetime(lower)}")
+    if upper is not None:
+        filters.append(f"{field} lt {format_odata_datetime(upper)}")
+    return " and ".join(filters) or None
+
+
+def get_period_partitions(
+    start: datetime, end: datetime, count: int, field: str = "Period"
+) -> list[str | None]:
+    """
+    Делит записи на ``count`` разделов по равным промежуткам времени между
+    ``start`` и ``end``. Возвращает фильтры разделов; крайние разделы открыты,
+    поэтому записи вне промежутка тоже попадают в выдачу.
+    """
+    bounds = get_period_bounds(start, end, count)
+    return [
+        get_period_filter(lower, upper, field)
+        for lower, upper in zip([None, *bounds], [*bounds, None])
+    ]
+
+
+class OneCODataClient(BaseOneCODataClient):
+    """
+    Клиент для взаимодействия с 1c по API.
+    """
+
+    # ``requests`` оборачивает ошибки urllib3 в ``ConnectionError``. Отказ
+    # в соединении и ошибка DNS (``NewConnectionError``) — наследники
+    # ``ConnectTimeoutError``
+    connect_errors = (ConnectTimeoutError,)
+
+    def __init__(self, url="", username="", password=""):
+        super().__init__(url, username, password)
 
         self.session = requests.Session()
         self.session.auth = (self.odata_username.encode(), self.odata_password.encode())
+        # Пул соединений на все потоки параллельной загрузки
+        adapter = HTTPAdapter(pool_maxsize=settings.ONEC_MAX_WORKERS)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(
+        self,
+        method: str,
+        odata_entity: str,
+        params: dict | None = None,
+        data: dict | None = None,
+        odata_format: str = "json",
+        use_cache: bool = False,
+    ) -> dict | str:
+        """
+        Запрос к 1с. Сетевые ошибки, таймауты и ответы ``RETRY_STATUS_CODES``
+        повторяются ``ONEC_RETRIES`` раз с экспоненциальной задержкой.
+        Неидемпотентные запросы повторяются, только если соединение
+        не установилось.
+
+        С ``use_cache`` ответ сохраняется в ``ResponseCache``, а повторный
+        запрос отправляется условным и на ``304`` возвращает сохранённый ответ.
+        """
+        url, headers = self.prepare_request(
+            odata_entity, params, odata_format, use_cache
+        )
+
+        for attempt in itertools.count():
+            self.circuit_breaker.before_request()
+            try:
+                response = self.session.request(
+                    method,
+                    url,
+                    json=data,
+                    headers=headers,
+                    timeout=(
+                        settings.ONEC_CONNECT_TIMEOUT,
+                        settings.ONEC_REQUESTS_TIMEOUT,
+                    ),
+                )
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if not self.should_retry_error(method, error, attempt):
+                    raise
+            else:
+                if not self.should_retry_response(method, response, attempt):
+                    break
+            time.sleep(get_retry_delay(attempt))
+
+        return self.handle_response(response, url, use_cache)
 
     def get(
         self,
@@ -44,115 +168,153 @@ class OneCODataClient:
         odata_expand: str | None = None,
         odata_count: int = 0,
         odata_format: str = "json",
+        odata_skip: int = 0,
+        odata_orderby: str | None = None,
+        use_cache: bool = False,
     ) -> dict:
-        url = f"{self.odata_url}/{odata_entity}"
-        params = {"$format": odata_format}
-        if odata_filter is not None:
-            params["$filter"] = odata_filter
-        if odata_select is not None:
-            params["$select"] = odata_select
-        if odata_count > 0:
-            params["$top"] = odata_count
-        if odata_expand is not None:
-            params["$expand"] = odata_expand
-
-        params_encoded = urlencode(params, quote_via=quote)
-
-        response = self.session.get(
-            f"{url}?{params_encoded}", timeout=settings.ONEC_REQUESTS_TIMEOUT
+        params = get_odata_params(
+            odata_filter=odata_filter,
+            odata_select=odata_select,
+            odata_expand=odata_expand,
+            odata_count=odata_count,
+            odata_skip=odata_skip,
+            odata_orderby=odata_orderby,
+        )
+        return self.request(
+            "GET",
+            odata_entity,
+            params,
+            odata_format=odata_format,
+            use_cache=use_cache,
         )
-        logger.info("Got response from OneC API")
-        response.encoding = "utf-8-sig"
-
-        if response.status_code == 401:
-            raise PermissionError(
-                "Wrong username or password for OData client provided"
-            )
 
-        return response.json()
+    def iter_pages(
+        self,
+        odata_entity: str,
+        odata_filter: str | None = None,
+        odata_select: str | None = None,
+        odata_expand: str | None = None,
+        odata_orderby: str | None = None,
+        page_size: int | None = None,
+        use_cache: bool = False,
+    ) -> Iterator[list[dict]]:
+        """
+        Перебирает страницы объектов сущности 1с по ``page_size``, чтобы
+        в памяти была только одна страница.
+
+        ``odata_orderby`` — уникальный ключ сущности по возрастанию, например
+        ``Ref_Key`` или ``Recorder,LineNumber``. Следующая страница
+        запрашивается фильтром по ключу больше ключа последнего объекта,
+        а не ``$skip``: объекты, добавленные или удалённые в 1с во время
+        перебора, не сдвигают страницы, и 1с не пропускает всё больше записей
+        на каждой странице.
+        """
+        page_size = page_size or settings.ONEC_PAGE_SIZE
+        key_fields = get_key_fields(odata_orderby)
+        odata_select = get_page_select(odata_select, key_fields)
+        last_object = None
+        while True:
+            objects_odata = self.get(
+                odata_entity,
+                odata_filter=get_page_filter(odata_filter, key_fields, last_object),
+                odata_select=odata_select,
+                odata_expand=odata_expand,
+                odata_count=page_size,
+                odata_orderby=odata_orderby,
+                use_cache=use_cache,
+            )["value"]
+            yield objects_odata
+            if len(objects_odata) < page_size:
+                return
+            last_object = objects_odata[-1]
+
+    def iter_entities(self, odata_entity: str, **kwargs) -> Iterator[dict]:
+        """
+        Перебирает объекты сущности 1с постранично, см. ``iter_pages``.
+        """
+        for objects_odata in self.iter_pages(odata_entity, **kwargs):
+            yield from objects_odata
+
+    def iter_entities_partitioned(
+        self,
+        odata_entity: str,
+        partition_filters: list[str | None],
+        odata_filter: str | None = None,
+        max_workers: int | None = None,
+        **kwargs,
+    ) -> Iterator[dict]:
+        """
+        Перебирает объекты сущности 1с, загружая разделы ``partition_filters``
+        параллельно в пуле из ``max_workers`` потоков. Объекты разных разделов
+        выдаются вперемешку по мере загрузки страниц.
+
+        Очередь страниц ограничена, поэтому потоки не загружают данные быстрее,
+        чем их обрабатывает синхронизатор.
+        """
+        max_workers = max_workers or settings.ONEC_MAX_WORKERS
+        pages = queue.Queue(maxsize=max_workers * 2)
+        stop = threading.Event()
+
+        def put(item) -> None:
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=1)
+                    return
+                except queue.Full:
+                    continue
+
+        def fetch_partition(partition_filter: str | None) -> None:
+            filters = [f"({f})" for f in (odata_filter, partition_filter) if f]
+            try:
+                pages_odata = self.iter_pages(
+                    odata_entity, odata_filter=" and ".join(filters) or None, **kwargs
+                )
+                for objects_odata in pages_odata:
+                    if stop.is_set():
+                        return
+                    put(objects_odata)
+            except Exception as error:
+                put(error)
+            finally:
+                put(PARTITION_DONE)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        for partition_filter in partition_filters:
+            executor.submit(fetch_partition, partition_filter)
+        try:
+            remaining = len(partition_filters)
+            while remaining:
+                item = pages.get()
+                if item is PARTITION_DONE:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield from item
+        finally:
+            stop.set()
+            executor.shutdown(cancel_futures=True)
 
     def post(
         self, odata_entity: str, create_data: dict, odata_format: str = "json"
     ) -> dict:
-        url = f"{self.odata_url}/{odata_entity}"
-        params = {"$format": odata_format}
-
-        params_encoded = urlencode(params, quote_via=quote)
-
-        response = self.session.post(
-            f"{url}?{params_encoded}",
-            json=create_data,
-            timeout=settings.ONEC_REQUESTS_TIMEOUT,
+        return self.request(
+            "POST", odata_entity, data=create_data, odata_format=odata_format
         )
-        response.encoding = "utf-8-sig"
-
-        if response.status_code == 401:
-            raise PermissionError(
-                "Wrong username or password for OData client provided"
-            )
-
-        return response.json()
 
     def patch(
         self, odata_entity: str, update_data: dict, odata_format: str = "json"
     ) -> dict:
-        url = f"{self.odata_url}/{odata_entity}"
-        params = {"$format": odata_format}
-
-        params_encoded = urlencode(params, quote_via=quote)
-
-        response = self.session.patch(
-            f"{url}?{params_encoded}",
-            json=update_data,
-            timeout=settings.ONEC_REQUESTS_TIMEOUT,
+        return self.request(
+            "PATCH", odata_entity, data=update_data, odata_format=odata_format
         )
-        response.encoding = "utf-8-sig"
-
-        if response.status_code == 401:
-            raise PermissionError(
-                "Wrong username or password for OData client provided"
-            )
-
-        return response.json()
 
     def put(
         self, odata_entity: str, update_data: dict, odata_format: str = "json"
     ) -> dict:
-        url = f"{self.odata_url}/{odata_entity}"
-        params = {"$format": odata_format}
-
-        params_encoded = urlencode(params, quote_via=quote)
-
-        response = self.session.put(
-            f"{url}?{params_encoded}",
-            json=update_data,
-            timeout=settings.ONEC_REQUESTS_TIMEOUT,
+        return self.request(
+            "PUT", odata_entity, data=update_data, odata_format=odata_format
         )
-        response.encoding = "utf-8-sig"
-
-        if response.status_code == 401:
-            raise PermissionError(
-                "Wrong username or password for OData client provided"
-            )
-
-        return response.json()
 
     def delete(self, odata_entity: str, odata_format: str = "json") -> dict | str:
-        url = f"{self.odata_url}/{odata_entity}"
-        params = {"$format": odata_format}
-
-        params_encoded = urlencode(params, quote_via=quote)
-
-        response = self.session.delete(
-            f"{url}?{params_encoded}", timeout=settings.ONEC_REQUESTS_TIMEOUT
-        )
-        response.encoding = "utf-8-sig"
-
-        if response.status_code == 401:
-            raise PermissionError(
-                "Wrong username or password for OData client provided"
-            )
-        if response.status_code == 204:
-            return ""
-
-        return response.json()
+        return self.request("DELETE", odata_entity, odata_format=odata_format)
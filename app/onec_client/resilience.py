@@ -0,0 +1,77 @@
+"""
+Повторы запросов к 1с с экспоненциальной задержкой и автоматический
+выключатель (circuit breaker), который перестаёт нагружать 1с после серии
+неудачных запросов.
+"""
+
+import random
+import threading
+import time
+
+from django.conf import settings
+
+# Ответы 1с, после которых запрос имеет смысл повторить
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Методы, которые можно повторить, даже если 1с могла выполнить запрос
+IDEMPOTENT_METHODS = frozenset({"GET", "PUT", "DELETE"})
+
+
+class CircuitBreakerOpen(Exception):
+    """
+    Запросы к 1с не отправляются: выключатель разомкнут после серии ошибок.
+    """
+
+
+def get_retry_delay(attempt: int) -> float:
+    """
+    Задержка перед повтором номер ``attempt`` (с нуля): экспоненциальная
+    с полным случайным разбросом, чтобы воркеры не повторяли запросы
+    одновременно.
+    """
+    max_delay = min(
+        settings.ONEC_RETRY_BACKOFF_MAX, settings.ONEC_RETRY_BACKOFF * 2**attempt
+    )
+    return random.uniform(0, max_delay)
+
+
+class CircuitBreaker:
+    """
+    После ``failure_threshold`` неудачных запросов подряд выключатель
+    размыкается, и запросы сразу завершаются ``CircuitBreakerOpen``.
+    Через ``reset_timeout`` секунд пропускается пробный запрос: если он
+    успешен, выключатель замыкается.
+    """
+
+    def __init__(
+        self, failure_threshold: int | None = None, reset_timeout: float | None = None
+    ) -> None:
+        self.failure_threshold = (
+            failure_threshold or settings.ONEC_CIRCUIT_BREAKER_THRESHOLD
+        )
+        self.reset_timeout = reset_timeout or settings.ONEC_CIRCUIT_BREAKER_TIMEOUT
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def before_request(self) -> None:
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitBreakerOpen("OneC API is unavailable, requests are paused")
+            # Пропускаем один пробный запрос. Остальные запросы не ждут его
+            # результата, а сразу завершаются CircuitBreakerOpen, пока пробный
+            # запрос не завершится успешно или снова не истечёт reset_timeout
+            self.opened_at = time.monotonic()
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
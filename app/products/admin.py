@@ -3,10 +3,15 @@ from django.contrib import admin
 from .models import (
     Barcode,
     Characteristic,
+    CurrentPrice,
     PriceChange,
     PriceType,
     Product,
     ProductMovement,
+    StockBalance,
+    SyncRun,
+    SyncState,
+    Tombstone,
 )
 
 
@@ -38,3 +43,42 @@ class ProductMovementAdmin(admin.ModelAdmin):
 @admin.register(PriceChange)
 class PriceChangeAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(StockBalance)
+class StockBalanceAdmin(admin.ModelAdmin):
+    pass
+
+
+@admin.register(CurrentPrice)
+class CurrentPriceAdmin(admin.ModelAdmin):
+    pass
+
+
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    pass
+
+
+@admin.register(SyncState)
+class SyncStateAdmin(admin.ModelAdmin):
+    pass
+
+
+@admin.register(SyncRun)
+class SyncRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "entity",
+        "started_at",
+        "duration",
+        "fetch_time",
+        "parse_time",
+        "write_time",
+        "bytes_received",
+        "created_count",
+        "updated_count",
+        "deleted_count",
+        "unchanged",
+    )
+    list_filter = ("entity", "unchanged")
+    readonly_fields = [field.name for field in SyncRun._meta.fields]
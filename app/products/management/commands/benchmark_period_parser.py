@@ -0,0 +1,70 @@
+"""
+Сравнение скорости разбора времени ``Period`` от 1с: ``dateutil``
+и ``parse_odata_datetime``.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from dateutil import parser
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from onec_client.client import _parse_odata_datetime, parse_odata_datetime
+
+
+def parse_with_dateutil(value: str) -> datetime:
+    return parser.parse(value).astimezone(timezone.get_current_timezone())
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает время разбора синтетических значений Period через dateutil "
+        "и через parse_odata_datetime."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=1000000,
+            help="Сколько значений Period разобрать.",
+        )
+        parser.add_argument(
+            "--rows-per-period",
+            type=int,
+            default=1,
+            help=(
+                "Сколько записей подряд имеют одинаковый Period, как строки "
+                "одного документа."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        values = self.get_values(options["count"], options["rows_per_period"])
+        parsers = {
+            "dateutil": parse_with_dateutil,
+            "parse_odata_datetime": parse_odata_datetime,
+        }
+        results = {}
+        for name, parse in parsers.items():
+            _parse_odata_datetime.cache_clear()
+            start = time.perf_counter()
+            results[name] = [parse(value) for value in values]
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{name}: {elapsed:.2f}s, {len(values) / elapsed:,.0f} values/s"
+            )
+        if results["dateutil"] != results["parse_odata_datetime"]:
+            raise CommandError("Результаты разбора не совпадают")
+
+    def get_values(self, count: int, rows_per_period: int) -> list[str]:
+        """
+        Значения ``Period`` в формате 1с с шагом в секунду.
+        """
+        start = datetime(2022, 1, 1)
+        return [
+            (start + timedelta(seconds=i // rows_per_period)).strftime(
+                "%Y-%m-%dT%H:%M:%S"
+            )
+            for i in range(count)
+        ]
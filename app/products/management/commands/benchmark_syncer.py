@@ -0,0 +1,99 @@
+"""
+Сравнение скорости синхронизации движений товаров: ``bulk_create``
+(``ODataToDjangoDataSyncer``) и ``COPY`` (``ODataToDjangoCopySyncer``).
+
+Каждый замер выполняется в транзакции, которая затем откатывается,
+поэтому данные в БД не меняются.
+"""
+
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from products.models import Characteristic, Product, ProductMovement, StockBalance
+from products.syncer import ODataToDjangoCopySyncer, ODataToDjangoDataSyncer
+
+FIELDS_MAPPING = {
+    "product_id": "Номенклатура_Key",
+    "characteristic_id": "Характеристика_Key",
+    "amount": "Количество",
+    "period": "Period",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает время синхронизации синтетических движений товаров "
+        "через bulk_create и через COPY."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=100000,
+            help="Сколько синтетических движений товаров синхронизировать.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Сколько раз повторить каждый замер.",
+        )
+
+    def handle(self, *args, **options):
+        objects_odata = self.get_objects_odata(options["count"])
+        syncer_classes = {
+            "bulk_create": ODataToDjangoDataSyncer,
+            "COPY": ODataToDjangoCopySyncer,
+        }
+        for name, syncer_class in syncer_classes.items():
+            timings = []
+            for _ in range(options["repeat"]):
+                syncer = syncer_class(
+                    model=ProductMovement,
+                    objects_odata=objects_odata,
+                    fields_mapping=FIELDS_MAPPING,
+                    postproc_function=StockBalance.objects.apply_movements,
+                    update=False,
+                )
+                with transaction.atomic():
+                    start = time.perf_counter()
+                    result = syncer.sync_objects()
+                    timings.append(time.perf_counter() - start)
+                    transaction.set_rollback(True)
+            self.stdout.write(
+                f"{name}: best {min(timings):.2f}s, "
+                f"mean {sum(timings) / len(timings):.2f}s ({result})"
+            )
+
+    def get_objects_odata(self, count: int) -> list[dict]:
+        """
+        Синтетические движения товаров в формате 1с: текущие движения из БД
+        и ``count`` новых.
+        """
+        product_ids = list(Product.objects.values_list("ref_key", flat=True))
+        characteristic_ids = list(
+            Characteristic.objects.values_list("ref_key", flat=True)
+        )
+        if not product_ids or not characteristic_ids:
+            raise CommandError("Нет товаров или характеристик для движений")
+
+        objects_odata = [
+            dict(zip(FIELDS_MAPPING.values(), row))
+            for row in ProductMovement.objects.values_list(*FIELDS_MAPPING.keys())
+        ]
+        now = timezone.now()
+        for i in range(count):
+            objects_odata.append(
+                {
+                    "Номенклатура_Key": str(random.choice(product_ids)),
+                    "Характеристика_Key": str(random.choice(characteristic_ids)),
+                    "Количество": random.randint(-10, 10),
+                    "Period": now - timedelta(seconds=i),
+                }
+            )
+        return objects_odata
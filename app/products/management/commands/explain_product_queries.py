@@ -0,0 +1,205 @@
+"""
+Планы выполнения запросов товаров: остатков, цен и списков.
+
+Чтобы сравнить планы до и после индексов, запустите команду
+с ``--without-indexes``, затем без него. С флагом индексы движений и изменений
+цен удаляются в транзакции, которая откатывается после замера; до конца замера
+таблицы заблокированы, поэтому флаг — только для тестовой БД.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.test.utils import CaptureQueriesContext
+from products.models import (
+    CurrentPrice,
+    PriceChange,
+    Product,
+    ProductMovement,
+    StockBalance,
+)
+
+SEED_PRODUCT_MOVEMENTS_SQL = """
+WITH
+    p AS (SELECT array_agg(ref_key) AS keys FROM products_product),
+    c AS (SELECT array_agg(ref_key) AS keys FROM products_characteristic)
+INSERT INTO products_productmovement
+    (product_id, characteristic_id, amount, period, updated_at)
+SELECT
+    p.keys[1 + floor(random() * array_length(p.keys, 1))::int],
+    c.keys[1 + floor(random() * array_length(c.keys, 1))::int],
+    floor(random() * 21)::int - 10,
+    NOW() - g * INTERVAL '1 second',
+    NOW()
+FROM generate_series(1, %s) AS g, p, c
+ON CONFLICT DO NOTHING
+"""
+
+SEED_PRICE_CHANGES_SQL = """
+WITH
+    p AS (SELECT array_agg(ref_key) AS keys FROM products_product),
+    c AS (SELECT array_agg(ref_key) AS keys FROM products_characteristic),
+    t AS (SELECT array_agg(ref_key) AS keys FROM products_pricetype)
+INSERT INTO products_pricechange
+    (product_id, characteristic_id, price_type_id, price, period, updated_at)
+SELECT
+    p.keys[1 + floor(random() * array_length(p.keys, 1))::int],
+    c.keys[1 + floor(random() * array_length(c.keys, 1))::int],
+    t.keys[1 + floor(random() * array_length(t.keys, 1))::int],
+    100 + floor(random() * 10000)::int,
+    NOW() - g * INTERVAL '1 second',
+    NOW()
+FROM generate_series(1, %s) AS g, p, c, t
+ON CONFLICT DO NOTHING
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Выводит планы выполнения (EXPLAIN ANALYZE) запросов остатков, цен "
+        "и списков. Заполнение синтетическими данными — только для тестовой БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--product",
+            help="Ключ товара. По умолчанию — товар с наибольшим числом движений.",
+        )
+        parser.add_argument(
+            "--offset",
+            type=int,
+            default=100000,
+            help="Смещение для запросов списков (глубокая страница).",
+        )
+        parser.add_argument(
+            "--seed-product-movements",
+            type=int,
+            default=0,
+            help="Сколько синтетических движений товаров добавить перед замером.",
+        )
+        parser.add_argument(
+            "--seed-price-changes",
+            type=int,
+            default=0,
+            help="Сколько синтетических изменений цен добавить перед замером.",
+        )
+        parser.add_argument(
+            "--without-indexes",
+            action="store_true",
+            help=(
+                "Замерить без индексов движений и изменений цен: индексы "
+                "удаляются в транзакции, которая откатывается после замера."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        self.seed(options["seed_product_movements"], options["seed_price_changes"])
+
+        product = self.get_product(options["product"])
+        offset = options["offset"]
+        page_end = offset + settings.CURSOR_PAGINATION_PAGE_SIZE
+        price_type_id = product.current_prices.values_list(
+            "price_type_id", flat=True
+        ).first()
+
+        scenarios = {
+            "get_amounts": product.get_amounts,
+            "get_prices": product.get_prices,
+            "get_prices (price_type)": lambda: product.get_prices(price_type_id),
+            "history: SUM(amount) by characteristic": lambda: list(
+                product.product_movements.order_by()
+                .values("characteristic_id")
+                .annotate(amount_sum=Sum("amount"))
+            ),
+            "history: latest price by characteristic and price type": lambda: list(
+                product.price_changes.order_by(
+                    "characteristic_id", "price_type_id", "-period"
+                )
+                .distinct("characteristic_id", "price_type_id")
+                .values_list("characteristic_id", "price_type_id", "price")
+            ),
+            "list (offset): product-movements": lambda: list(
+                ProductMovement.objects.order_by("-period", "-id")[offset:page_end]
+            ),
+            "list (offset): price-changes": lambda: list(
+                PriceChange.objects.order_by("-period", "-id")[offset:page_end]
+            ),
+            "list (offset): products": lambda: list(
+                Product.objects.order_by("ref_key")[offset:page_end]
+            ),
+            "list (cursor): product-movements": lambda: self.cursor_page(
+                ProductMovement, offset
+            ),
+            "list (cursor): price-changes": lambda: self.cursor_page(
+                PriceChange, offset
+            ),
+        }
+        with transaction.atomic():
+            if options["without_indexes"]:
+                self.drop_indexes()
+            for name, scenario in scenarios.items():
+                self.explain(name, scenario)
+            # Удалённые индексы возвращает откат транзакции
+            transaction.set_rollback(True)
+
+    def cursor_page(self, model, offset: int) -> list:
+        """
+        Страница списка после ``offset`` строк так, как её выбирает
+        ``PeriodCursorPagination``: по значению ключа, а не смещением.
+        Первый запрос находит значение ключа на глубине ``offset`` — клиент
+        получает его в курсоре предыдущей страницы.
+        """
+        queryset = model.objects.order_by("-period", "-id")
+        position = queryset.values_list("period", flat=True)[offset:].first()
+        if position is None:
+            raise CommandError(
+                f"В {model._meta.db_table} не больше {offset} строк, "
+                "уменьшите --offset"
+            )
+        page_size = settings.CURSOR_PAGINATION_PAGE_SIZE
+        return list(queryset.filter(period__lte=position)[:page_size])
+
+    def drop_indexes(self) -> None:
+        with connection.schema_editor(atomic=False) as schema_editor:
+            for model in (ProductMovement, PriceChange):
+                for index in model._meta.indexes:
+                    schema_editor.remove_index(model, index)
+
+    def seed(self, product_movements_count: int, price_changes_count: int) -> None:
+        with connection.cursor() as cursor:
+            if product_movements_count:
+                cursor.execute(SEED_PRODUCT_MOVEMENTS_SQL, [product_movements_count])
+                StockBalance.objects.rebuild()
+                cursor.execute("ANALYZE products_productmovement")
+            if price_changes_count:
+                cursor.execute(SEED_PRICE_CHANGES_SQL, [price_changes_count])
+                CurrentPrice.objects.rebuild()
+                cursor.execute("ANALYZE products_pricechange")
+
+    def get_product(self, product_id: str | None) -> Product:
+        if product_id:
+            return Product.objects.get(pk=product_id)
+        product_id = (
+            ProductMovement.objects.values("product_id")
+            .annotate(movements_count=Count("id"))
+            .order_by("-movements_count")
+            .values_list("product_id", flat=True)
+            .first()
+        )
+        if product_id is None:
+            raise CommandError("Нет движений товаров, передайте --product")
+        return Product.objects.get(pk=product_id)
+
+    def explain(self, name, scenario) -> None:
+        with CaptureQueriesContext(connection) as context:
+            scenario()
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{name}: {len(context)} queries"))
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                self.stdout.write(query["sql"])
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {query['sql']}")
+                for (line,) in cursor.fetchall():
+                    self.stdout.write(f"    {line}")
+        self.stdout.write("")
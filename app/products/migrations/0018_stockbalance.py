@@ -0,0 +1,72 @@
+# Generated by Django 4.1.2 on 2026-10-18 07:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0017_alter_pricechange_options"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockBalance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("amount", models.IntegerField(verbose_name="Количество")),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Время обновления"
+                    ),
+                ),
+                (
+                    "characteristic",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_balances",
+                        to="products.characteristic",
+                        verbose_name="Характеристика",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_balances",
+                        to="products.product",
+                        verbose_name="Товар",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Остаток товара",
+                "verbose_name_plural": "Остатки товаров",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="stockbalance",
+            constraint=models.UniqueConstraint(
+                fields=("product", "characteristic"), name="unique_stock_balance"
+            ),
+        ),
+        migrations.RunSQL(
+            sql=(
+                "INSERT INTO products_stockbalance "
+                "(product_id, characteristic_id, amount, updated_at) "
+                "SELECT product_id, characteristic_id, SUM(amount), NOW() "
+                "FROM products_productmovement GROUP BY product_id, characteristic_id"
+            ),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
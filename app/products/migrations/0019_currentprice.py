@@ -0,0 +1,79 @@
+# Generated by Django 4.1.2 on 2026-10-18 07:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0018_stockbalance"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CurrentPrice",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("price", models.PositiveIntegerField(verbose_name="Цена")),
+                ("period", models.DateTimeField(verbose_name="Время и дата")),
+                (
+                    "characteristic",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="current_prices",
+                        to="products.characteristic",
+                        verbose_name="Характеристика",
+                    ),
+                ),
+                (
+                    "price_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="current_prices",
+                        to="products.pricetype",
+                        verbose_name="Вид цены",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="current_prices",
+                        to="products.product",
+                        verbose_name="Товар",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Текущая цена",
+                "verbose_name_plural": "Текущие цены",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="currentprice",
+            constraint=models.UniqueConstraint(
+                fields=("product", "price_type", "characteristic"),
+                name="unique_current_price",
+            ),
+        ),
+        migrations.RunSQL(
+            sql=(
+                "INSERT INTO products_currentprice "
+                "(product_id, characteristic_id, price_type_id, price, period) "
+                "SELECT DISTINCT ON (product_id, characteristic_id, price_type_id) "
+                "product_id, characteristic_id, price_type_id, price, period "
+                "FROM products_pricechange "
+                "ORDER BY product_id, characteristic_id, price_type_id, period DESC"
+            ),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.2 on 2026-10-18 07:49
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("products", "0019_currentprice"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="pricechange",
+            index=models.Index(
+                fields=["product", "characteristic", "price_type", "-period"],
+                include=("price",),
+                name="pricechange_latest_price_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="pricechange",
+            index=models.Index(fields=["-period"], name="pricechange_period_idx"),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.1.2 on 2026-10-18 07:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0020_pricechange_indexes"),
+    ]
+
+    # Столбцы updated_at добавляются с постоянным значением по умолчанию (время
+    # миграции), поэтому PostgreSQL не переписывает таблицы. Индексы по ним
+    # строятся без блокировки записи в 0026_updated_at_indexes.
+    operations = [
+        migrations.CreateModel(
+            name="Tombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model_name", models.CharField(max_length=63, verbose_name="Модель")),
+                (
+                    "object_id",
+                    models.CharField(max_length=36, verbose_name="ID объекта"),
+                ),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        auto_now_add=True, db_index=True, verbose_name="Время удаления"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Удалённый объект",
+                "verbose_name_plural": "Удалённые объекты",
+            },
+        ),
+        migrations.AddField(
+            model_name="barcode",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Время обновления"),
+        ),
+        migrations.AddField(
+            model_name="characteristic",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Время обновления"),
+        ),
+        migrations.AddField(
+            model_name="pricechange",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Время обновления"),
+        ),
+        migrations.AddField(
+            model_name="pricetype",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Время обновления"),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Время обновления"),
+        ),
+        migrations.AddField(
+            model_name="productmovement",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Время обновления"),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.1.2 on 2026-10-18 07:53
+
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    RemoveIndexConcurrently,
+)
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("products", "0021_updated_at_tombstone"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="pricechange",
+            index=models.Index(
+                fields=["-period", "-id"], name="pricechange_period_id_idx"
+            ),
+        ),
+        RemoveIndexConcurrently(
+            model_name="pricechange",
+            name="pricechange_period_idx",
+        ),
+        AddIndexConcurrently(
+            model_name="productmovement",
+            index=models.Index(
+                fields=["-period", "-id"], name="productmovement_period_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.1.2 on 2026-10-18 07:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0022_cursor_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SyncState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "entity",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="Сущность 1с"
+                    ),
+                ),
+                (
+                    "high_water_mark",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Время последней записи"
+                    ),
+                ),
+                (
+                    "last_full_sync_at",
+                    models.DateTimeField(
+                        blank=True,
+                        null=True,
+                        verbose_name="Время последней полной сверки",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Время обновления"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Состояние синхронизации",
+                "verbose_name_plural": "Состояния синхронизации",
+            },
+        ),
+    ]
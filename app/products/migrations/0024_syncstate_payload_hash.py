@@ -0,0 +1,20 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0023_syncstate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="syncstate",
+            name="payload_hash",
+            field=models.CharField(
+                blank=True, max_length=64, verbose_name="Хэш данных от 1с"
+            ),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:08
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0024_syncstate_payload_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SyncRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "entity",
+                    models.CharField(
+                        db_index=True, max_length=63, verbose_name="Сущность"
+                    ),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        db_index=True,
+                        default=django.utils.timezone.now,
+                        verbose_name="Время начала",
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Время окончания"
+                    ),
+                ),
+                (
+                    "fetch_time",
+                    models.FloatField(default=0, verbose_name="Загрузка из 1с, с"),
+                ),
+                (
+                    "parse_time",
+                    models.FloatField(default=0, verbose_name="Разбор данных, с"),
+                ),
+                (
+                    "write_time",
+                    models.FloatField(default=0, verbose_name="Запись в БД, с"),
+                ),
+                (
+                    "bytes_received",
+                    models.BigIntegerField(
+                        blank=True, null=True, verbose_name="Получено от 1с, байт"
+                    ),
+                ),
+                (
+                    "created_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Создано"),
+                ),
+                (
+                    "updated_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Обновлено"),
+                ),
+                (
+                    "deleted_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Удалено"),
+                ),
+                (
+                    "unchanged",
+                    models.BooleanField(
+                        default=False, verbose_name="Данные от 1с не изменились"
+                    ),
+                ),
+                ("error", models.TextField(blank=True, verbose_name="Ошибка")),
+            ],
+            options={
+                "verbose_name": "Запуск синхронизации",
+                "verbose_name_plural": "Запуски синхронизации",
+                "ordering": ("-started_at",),
+            },
+        ),
+    ]
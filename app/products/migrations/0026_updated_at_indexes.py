@@ -0,0 +1,46 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:37
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("products", "0025_syncrun"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="barcode",
+            index=models.Index(fields=["updated_at"], name="barcode_updated_at_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="characteristic",
+            index=models.Index(
+                fields=["updated_at"], name="characteristic_updated_at_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="pricechange",
+            index=models.Index(
+                fields=["updated_at"], name="pricechange_updated_at_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="pricetype",
+            index=models.Index(fields=["updated_at"], name="pricetype_updated_at_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="product",
+            index=models.Index(fields=["updated_at"], name="product_updated_at_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="productmovement",
+            index=models.Index(
+                fields=["updated_at"], name="productmovement_updated_at_idx"
+            ),
+        ),
+    ]
@@ -1,6 +1,13 @@
 import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable
 
-from django.db import models
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .product_cache import invalidate_products
 
 
 class Product(models.Model):
@@ -13,72 +20,70 @@ class Product(models.Model):
 
     sku = models.CharField(max_length=31, verbose_name="Артикул")
 
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Время обновления")
+
     product_movements: models.Manager
 
     price_changes: models.Manager
 
-    def get_characteristic_ids(self):
-        """
-        Список ID характеристик, которые есть у данного товара
-        в таблице движений товара.
-        """
-        pm_characteristics = set(
-            self.product_movements.values_list(
-                "characteristic_id", flat=True
-            ).distinct()
-        )
-        pc_characteristics = set(
-            self.price_changes.values_list("characteristic_id", flat=True).distinct()
-        )
-        pm_characteristics.update(pc_characteristics)
-        return pm_characteristics
+    stock_balances: models.Manager
+
+    current_prices: models.Manager
 
-    def get_price(self, characteristic_id: str) -> int:
+    def get_amounts_by_characteristic(self) -> dict[uuid.UUID, int]:
         """
-        Актуальная цена товара с переданной характеристикой
+        Остатки товара по всем характеристикам из таблицы остатков.
         """
-        return (
-            PriceChange.objects.filter(
-                characteristic_id=characteristic_id, product=self
-            )
-            .first()
-            .price
-        )
+        return dict(self.stock_balances.values_list("characteristic_id", "amount"))
 
-    def get_amount(self, characteristic_id: str) -> int:
+    def get_prices_by_characteristic(
+        self, price_type_id: str | None = None
+    ) -> dict[uuid.UUID, int]:
         """
-        Остатки товара с переданной характеристикой
+        Актуальные цены товара по всем характеристикам из таблицы текущих цен.
+        Если вид цены не передан, для каждой характеристики берётся последняя
+        цена любого вида.
         """
-        return ProductMovement.objects.filter(
-            characteristic_id=characteristic_id, product=self
-        ).aggregate(models.Sum("amount"))["amount__sum"]
-
-    def get_amounts(self) -> dict[str, str | int]:
+        if price_type_id:
+            current_prices = self.current_prices.filter(price_type_id=price_type_id)
+        else:
+            current_prices = self.current_prices.order_by(
+                "characteristic_id", "-period"
+            ).distinct("characteristic_id")
+        return dict(current_prices.values_list("characteristic_id", "price"))
+
+    def get_amounts(self) -> list[dict[str, str | int]]:
         """
         Возвращает остатки по всем характеристикам товара.
         """
-        amounts = []
-        for characteristic_id in self.get_characteristic_ids():
-            amount = self.get_amount(characteristic_id)
-            amounts.append({"characteristic_id": characteristic_id, "amount": amount})
-        return amounts
+        amounts = self.get_amounts_by_characteristic()
+        characteristic_ids = amounts.keys() | set(
+            self.current_prices.values_list("characteristic_id", flat=True)
+        )
+        return [
+            {
+                "characteristic_id": characteristic_id,
+                "amount": amounts.get(characteristic_id),
+            }
+            for characteristic_id in characteristic_ids
+        ]
 
-    def get_prices(self) -> dict[str, str | int]:
+    def get_prices(
+        self, price_type_id: str | None = None
+    ) -> list[dict[str, str | int]]:
         """
         Возвращает остатки и актуальную стоимость по всем характеристикам товара.
         """
-        prices = []
-        for characteristic_id in self.get_characteristic_ids():
-            amount = self.get_amount(characteristic_id)
-            price = self.get_price(characteristic_id)
-            prices.append(
-                {
-                    "characteristic_id": characteristic_id,
-                    "amount": amount,
-                    "price": price,
-                }
-            )
-        return prices
+        amounts = self.get_amounts_by_characteristic()
+        prices = self.get_prices_by_characteristic(price_type_id)
+        return [
+            {
+                "characteristic_id": characteristic_id,
+                "amount": amounts.get(characteristic_id),
+                "price": prices.get(characteristic_id),
+            }
+            for characteristic_id in amounts.keys() | prices.keys()
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -86,6 +91,10 @@ class Product(models.Model):
     class Meta:
         verbose_name = "Товар"
         verbose_name_plural = "Товары"
+        indexes = [
+            # Выгрузка изменений для мобильных клиентов
+            models.Index(name="product_updated_at_idx", fields=("updated_at",)),
+        ]
 
 
 class PriceType(models.Model):
@@ -96,12 +105,18 @@ class PriceType(models.Model):
 
     name = models.CharField(max_length=31, verbose_name="Название")
 
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Время обновления")
+
     def __str__(self) -> str:
         return self.name
 
     class Meta:
         verbose_name = "Вид цены"
         verbose_name_plural = "Виды цен"
+        indexes = [
+            # Выгрузка изменений для мобильных клиентов
+            models.Index(name="pricetype_updated_at_idx", fields=("updated_at",)),
+        ]
 
 
 class Characteristic(models.Model):
@@ -112,12 +127,18 @@ class Characteristic(models.Model):
 
     name = models.CharField(max_length=31, verbose_name="Название")
 
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Время обновления")
+
     def __str__(self) -> str:
         return self.name
 
     class Meta:
         verbose_name = "Характеристика товара"
         verbose_name_plural = "Характеристики товаров"
+        indexes = [
+            # Выгрузка изменений для мобильных клиентов
+            models.Index(name="characteristic_updated_at_idx", fields=("updated_at",)),
+        ]
 
 
 class Barcode(models.Model):
@@ -138,6 +159,8 @@ class Barcode(models.Model):
 
     barcode = models.CharField(max_length=255, verbose_name="Штрикход")
 
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Время обновления")
+
     NOT_NATURAL_KEYS = tuple()
 
     def __str__(self) -> str:
@@ -151,6 +174,10 @@ class Barcode(models.Model):
                 name="unique_barcode", fields=("product", "characteristic", "barcode")
             )
         ]
+        indexes = [
+            # Выгрузка изменений для мобильных клиентов
+            models.Index(name="barcode_updated_at_idx", fields=("updated_at",)),
+        ]
 
 
 class ProductMovement(models.Model):
@@ -173,6 +200,8 @@ class ProductMovement(models.Model):
 
     period = models.DateTimeField(verbose_name="Время и дата")
 
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Время обновления")
+
     NOT_NATURAL_KEYS = tuple()
 
     def __str__(self) -> str:
@@ -187,6 +216,14 @@ class ProductMovement(models.Model):
                 fields=("product", "characteristic", "period", "amount"),
             )
         ]
+        indexes = [
+            # Постраничный вывод движений товаров по курсору
+            models.Index(
+                name="productmovement_period_id_idx", fields=("-period", "-id")
+            ),
+            # Выгрузка изменений для мобильных клиентов
+            models.Index(name="productmovement_updated_at_idx", fields=("updated_at",)),
+        ]
 
 
 class PriceChange(models.Model):
@@ -216,6 +253,8 @@ class PriceChange(models.Model):
         verbose_name="Вид цены",
     )
 
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Время обновления")
+
     NOT_NATURAL_KEYS = ("price_type_id",)
 
     def __str__(self) -> str:
@@ -230,4 +269,389 @@ class PriceChange(models.Model):
                 fields=("product", "characteristic", "period", "price"),
             )
         ]
+        indexes = [
+            # Последняя цена по товару, характеристике и виду цены
+            models.Index(
+                name="pricechange_latest_price_idx",
+                fields=("product", "characteristic", "price_type", "-period"),
+                include=("price",),
+            ),
+            # Постраничный вывод изменений цен по курсору
+            models.Index(name="pricechange_period_id_idx", fields=("-period", "-id")),
+            # Выгрузка изменений для мобильных клиентов
+            models.Index(name="pricechange_updated_at_idx", fields=("updated_at",)),
+        ]
         ordering = ("-period",)
+
+
+class StockBalanceManager(models.Manager):
+    def apply_movements(
+        self,
+        created_movements: Iterable[ProductMovement],
+        deleted_movements: Iterable[ProductMovement],
+    ) -> None:
+        """
+        Изменяет остатки на сумму созданных движений за вычетом удалённых.
+
+        Остатки увеличиваются в самой БД (``amount = amount + EXCLUDED.amount``),
+        поэтому одновременные синхронизации не перезаписывают изменения друг друга.
+        """
+        deltas = defaultdict(int)
+        for movement in created_movements:
+            deltas[(movement.product_id, movement.characteristic_id)] += movement.amount
+        for movement in deleted_movements:
+            deltas[(movement.product_id, movement.characteristic_id)] -= movement.amount
+        if not deltas:
+            return
+
+        table = self.model._meta.db_table
+        now = timezone.now()
+        # Сортируем ключи, чтобы параллельные транзакции блокировали строки
+        # в одном и том же порядке
+        rows = [(*key, amount, now) for key, amount in sorted(deltas.items())]
+        with transaction.atomic(), connection.cursor() as cursor:
+            for batch_start in range(0, len(rows), 1000):
+                batch_end = batch_start + 1000
+                batch = rows[batch_start:batch_end]
+                values = ", ".join(["(%s, %s, %s, %s)"] * len(batch))
+                cursor.execute(
+                    f"INSERT INTO {table} "
+                    "(product_id, characteristic_id, amount, updated_at) "
+                    f"VALUES {values} "
+                    "ON CONFLICT (product_id, characteristic_id) DO UPDATE SET "
+                    f"amount = {table}.amount + EXCLUDED.amount, "
+                    "updated_at = EXCLUDED.updated_at",
+                    [value for row in batch for value in row],
+                )
+            # Версии товаров меняются после фиксации изменённых остатков
+            invalidate_products({product_id for product_id, _ in deltas})
+
+    def rebuild(self) -> None:
+        """
+        Полностью пересчитывает остатки по таблице движений товаров.
+        """
+        table = self.model._meta.db_table
+        movements_table = ProductMovement._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(
+                f"INSERT INTO {table} "
+                "(product_id, characteristic_id, amount, updated_at) "
+                "SELECT product_id, characteristic_id, SUM(amount), %s "
+                f"FROM {movements_table} GROUP BY product_id, characteristic_id",
+                [timezone.now()],
+            )
+            invalidate_products()
+
+
+class StockBalance(models.Model):
+    """
+    Остатки товаров по характеристикам. Поддерживаются синхронизацией движений
+    товаров, чтобы не суммировать всю историю движений при каждом запросе.
+    """
+
+    product: Product = models.ForeignKey(
+        to=Product,
+        on_delete=models.CASCADE,
+        related_name="stock_balances",
+        verbose_name="Товар",
+    )
+
+    characteristic: Characteristic = models.ForeignKey(
+        to=Characteristic,
+        on_delete=models.CASCADE,
+        related_name="stock_balances",
+        verbose_name="Характеристика",
+    )
+
+    amount = models.IntegerField(verbose_name="Количество")
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Время обновления")
+
+    objects = StockBalanceManager()
+
+    def __str__(self) -> str:
+        return f"Остаток товара {self.product} {self.characteristic}"
+
+    class Meta:
+        verbose_name = "Остаток товара"
+        verbose_name_plural = "Остатки товаров"
+        constraints = [
+            models.UniqueConstraint(
+                name="unique_stock_balance", fields=("product", "characteristic")
+            )
+        ]
+
+
+class CurrentPriceManager(models.Manager):
+    def rebuild(self, product_ids: Iterable[uuid.UUID] | None = None) -> None:
+        """
+        Пересчитывает текущие цены по таблице изменений цен: для каждого
+        сочетания товара, характеристики и вида цены берётся последнее изменение.
+
+        :param product_ids: Если переданы, пересчитываются цены только этих товаров.
+
+        Удаление и вставка выполняются в одной транзакции, чтобы читатели
+        не видели цены пропавшими, пока пересчёт не закончился.
+        """
+        table = self.model._meta.db_table
+        price_changes_table = PriceChange._meta.db_table
+        where = ""
+        params = []
+        if product_ids is not None:
+            product_ids = list(product_ids)
+            if not product_ids:
+                return
+            where = "WHERE product_id = ANY(%s)"
+            params = [product_ids]
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table} {where}", params)
+            cursor.execute(
+                f"INSERT INTO {table} "
+                "(product_id, characteristic_id, price_type_id, price, period) "
+                "SELECT DISTINCT ON (product_id, characteristic_id, price_type_id) "
+                "product_id, characteristic_id, price_type_id, price, period "
+                f"FROM {price_changes_table} {where} "
+                "ORDER BY product_id, characteristic_id, price_type_id, period DESC",
+                params,
+            )
+            invalidate_products(product_ids)
+
+    def apply_price_changes(
+        self,
+        created_price_changes: Iterable[PriceChange],
+        deleted_price_changes: Iterable[PriceChange],
+    ) -> None:
+        """
+        Пересчитывает текущие цены товаров, по которым изменилась история цен.
+        """
+        product_ids = {
+            price_change.product_id
+            for price_changes in (created_price_changes, deleted_price_changes)
+            for price_change in price_changes
+        }
+        self.rebuild(sorted(product_ids))
+
+
+class CurrentPrice(models.Model):
+    """
+    Текущие цены товаров по характеристикам и видам цен. Пересчитываются
+    синхронизацией изменений цен, чтобы не перебирать историю цен при каждом запросе.
+    """
+
+    product: Product = models.ForeignKey(
+        to=Product,
+        on_delete=models.CASCADE,
+        related_name="current_prices",
+        verbose_name="Товар",
+    )
+
+    characteristic: Characteristic = models.ForeignKey(
+        to=Characteristic,
+        on_delete=models.CASCADE,
+        related_name="current_prices",
+        verbose_name="Характеристика",
+    )
+
+    price_type: PriceType = models.ForeignKey(
+        PriceType,
+        on_delete=models.CASCADE,
+        related_name="current_prices",
+        verbose_name="Вид цены",
+    )
+
+    price = models.PositiveIntegerField(verbose_name="Цена")
+
+    period = models.DateTimeField(verbose_name="Время и дата")
+
+    objects = CurrentPriceManager()
+
+    def __str__(self) -> str:
+        return f"Текущая цена {self.product} {self.characteristic} {self.price_type}"
+
+    class Meta:
+        verbose_name = "Текущая цена"
+        verbose_name_plural = "Текущие цены"
+        constraints = [
+            models.UniqueConstraint(
+                name="unique_current_price",
+                fields=("product", "price_type", "characteristic"),
+            )
+        ]
+
+
+class TombstoneManager(models.Manager):
+    def record(self, model: type[models.Model], object_ids: Iterable) -> None:
+        """
+        Записывает удаление объектов модели и удаляет устаревшие записи.
+        """
+        model_name = model._meta.model_name
+        self.bulk_create(
+            [
+                self.model(model_name=model_name, object_id=str(object_id))
+                for object_id in object_ids
+            ],
+            batch_size=1000,
+        )
+        self.filter(
+            deleted_at__lt=timezone.now() - settings.SYNC_DATA_TOMBSTONES_TTL
+        ).delete()
+
+
+class Tombstone(models.Model):
+    """
+    Запись об объекте, удалённом при синхронизации с 1с. Нужна, чтобы клиенты
+    при инкрементальной синхронизации узнавали об удалениях.
+    """
+
+    model_name = models.CharField(max_length=63, verbose_name="Модель")
+
+    object_id = models.CharField(max_length=36, verbose_name="ID объекта")
+
+    deleted_at = models.DateTimeField(
+        auto_now_add=True, db_index=True, verbose_name="Время удаления"
+    )
+
+    objects = TombstoneManager()
+
+    def __str__(self) -> str:
+        return f"Удаление {self.model_name} {self.object_id}"
+
+    class Meta:
+        verbose_name = "Удалённый объект"
+        verbose_name_plural = "Удалённые объекты"
+
+
+class SyncStateManager(models.Manager):
+    def get_since(self, entity: str) -> datetime | None:
+        """
+        Время, начиная с которого нужно запросить записи сущности 1с:
+        отметка последней синхронизации за вычетом перекрытия. ``None``, если
+        пора выполнить полную сверку.
+        """
+        sync_state = self.filter(entity=entity).first()
+        if (
+            sync_state is None
+            or sync_state.high_water_mark is None
+            or sync_state.last_full_sync_at is None
+            or sync_state.last_full_sync_at
+            < timezone.now() - settings.ONEC_FULL_SYNC_INTERVAL
+        ):
+            return None
+        since = sync_state.high_water_mark - settings.ONEC_SYNC_PERIOD_OVERLAP
+        # В фильтре 1с время передаётся с точностью до секунды
+        return since.replace(microsecond=0)
+
+    def mark_synced(
+        self, entity: str, high_water_mark: datetime | None, full: bool
+    ) -> None:
+        defaults = {"high_water_mark": high_water_mark}
+        if full:
+            defaults["last_full_sync_at"] = timezone.now()
+        self.update_or_create(entity=entity, defaults=defaults)
+
+    def get_payload_hash(self, entity: str) -> str | None:
+        return self.filter(entity=entity).values_list("payload_hash", flat=True).first()
+
+    def set_payload_hash(self, entity: str, payload_hash: str) -> None:
+        self.update_or_create(entity=entity, defaults={"payload_hash": payload_hash})
+
+
+class SyncState(models.Model):
+    """
+    Состояние синхронизации сущности 1с: отметка последней записи, время
+    последней полной сверки и хэш данных от 1с, сохранённых в последний раз.
+    """
+
+    entity = models.CharField(max_length=255, unique=True, verbose_name="Сущность 1с")
+
+    high_water_mark = models.DateTimeField(
+        null=True, blank=True, verbose_name="Время последней записи"
+    )
+
+    last_full_sync_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Время последней полной сверки"
+    )
+
+    payload_hash = models.CharField(
+        max_length=64, blank=True, verbose_name="Хэш данных от 1с"
+    )
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Время обновления")
+
+    objects = SyncStateManager()
+
+    def __str__(self) -> str:
+        return f"Синхронизация {self.entity}"
+
+    class Meta:
+        verbose_name = "Состояние синхронизации"
+        verbose_name_plural = "Состояния синхронизации"
+
+
+class SyncRun(models.Model):
+    """
+    Запуск синхронизации сущности 1с: время этапов, объём данных, количество
+    объектов и ошибка, если синхронизация не удалась.
+    """
+
+    entity = models.CharField(max_length=63, db_index=True, verbose_name="Сущность")
+
+    started_at = models.DateTimeField(
+        default=timezone.now, db_index=True, verbose_name="Время начала"
+    )
+
+    finished_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Время окончания"
+    )
+
+    fetch_time = models.FloatField(default=0, verbose_name="Загрузка из 1с, с")
+
+    parse_time = models.FloatField(default=0, verbose_name="Разбор данных, с")
+
+    write_time = models.FloatField(default=0, verbose_name="Запись в БД, с")
+
+    bytes_received = models.BigIntegerField(
+        null=True, blank=True, verbose_name="Получено от 1с, байт"
+    )
+
+    created_count = models.PositiveIntegerField(default=0, verbose_name="Создано")
+
+    updated_count = models.PositiveIntegerField(default=0, verbose_name="Обновлено")
+
+    deleted_count = models.PositiveIntegerField(default=0, verbose_name="Удалено")
+
+    unchanged = models.BooleanField(
+        default=False, verbose_name="Данные от 1с не изменились"
+    )
+
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+
+    def __str__(self) -> str:
+        return f"Синхронизация {self.entity} {self.started_at}"
+
+    @property
+    def duration(self) -> float | None:
+        if self.finished_at is None:
+            return None
+        return (self.finished_at - self.started_at).total_seconds()
+
+    def finish(self, stats: dict) -> None:
+        """
+        Записывает окончание синхронизации по ``stats`` синхронизатора.
+        """
+        self.finished_at = timezone.now()
+        self.fetch_time = stats["fetch_time"]
+        self.parse_time = stats["parse_time"]
+        self.write_time = stats["write_time"]
+        self.created_count = stats["created"]
+        self.updated_count = stats["updated"]
+        self.deleted_count = stats["deleted"]
+        self.unchanged = stats["unchanged"]
+        self.save()
+
+    class Meta:
+        verbose_name = "Запуск синхронизации"
+        verbose_name_plural = "Запуски синхронизации"
+        ordering = ("-started_at",)
@@ -0,0 +1,30 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class ProductsCursorPagination(CursorPagination):
+    """
+    Постраничный вывод по курсору: следующая страница выбирается по значению
+    ключа сортировки последней записи, а не смещением, поэтому обход всей таблицы
+    не сканирует уже выданные строки.
+    """
+
+    page_size = settings.CURSOR_PAGINATION_PAGE_SIZE
+    max_page_size = settings.CURSOR_PAGINATION_MAX_PAGE_SIZE
+    page_size_query_param = "page_size"
+
+
+class RefKeyCursorPagination(ProductsCursorPagination):
+    ordering = "ref_key"
+
+
+class IdCursorPagination(ProductsCursorPagination):
+    ordering = "id"
+
+
+class PeriodCursorPagination(ProductsCursorPagination):
+    ordering = ("-period", "-id")
+
+
+class StartedAtCursorPagination(ProductsCursorPagination):
+    ordering = ("-started_at", "-id")
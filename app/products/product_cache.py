@@ -0,0 +1,110 @@
+"""
+Кэш остатков и цен товаров.
+
+Данные товара кэшируются по ключу с версией товара и общей версией всех
+товаров. Синхронизация с 1с меняет версии товаров, остатки или цены которых
+изменились, поэтому устаревшие записи больше не читаются и со временем
+вытесняются из кэша.
+"""
+
+import time
+import uuid
+from typing import Any, Callable, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Общая версия всех товаров: меняется при полном пересчёте остатков или цен
+ALL_PRODUCTS_VERSION_KEY = "products:version"
+
+# Счётчики попаданий в кэш и промахов
+HITS_KEY = "products:cache:hits"
+MISSES_KEY = "products:cache:misses"
+
+
+def get_product_version_key(product_id: uuid.UUID | str) -> str:
+    return f"products:{product_id}:version"
+
+
+def new_version() -> int:
+    """
+    Новая версия, которая не совпадает ни с одной из прошлых, даже если
+    прошлая версия была вытеснена из кэша.
+    """
+    return time.time_ns()
+
+
+def get_versions(product_id: uuid.UUID | str) -> tuple[int, int]:
+    """
+    Версия товара и общая версия всех товаров.
+    """
+    keys = [get_product_version_key(product_id), ALL_PRODUCTS_VERSION_KEY]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return versions[keys[0]], versions[keys[1]]
+
+
+def incr_counter(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Счётчика ещё нет или он вытеснен из кэша
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_product_data(
+    product_id: uuid.UUID | str, name: str, get_data: Callable[[], Any], *params
+) -> Any:
+    """
+    Данные ``name`` товара с параметрами ``params`` из кэша. При промахе
+    данные вычисляются ``get_data`` и сохраняются в кэш.
+    """
+    product_version, all_products_version = get_versions(product_id)
+    key = ":".join(
+        map(
+            str,
+            ["products", product_id, product_version, all_products_version, name]
+            + ["" if param is None else param for param in params],
+        )
+    )
+    data = cache.get(key)
+    if data is not None:
+        incr_counter(HITS_KEY)
+        return data
+
+    incr_counter(MISSES_KEY)
+    data = get_data()
+    cache.set(key, data, timeout=settings.PRODUCT_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_products(product_ids: Iterable[uuid.UUID | str] | None = None) -> None:
+    """
+    Меняет версии товаров ``product_ids`` (``None`` — всех товаров) после
+    фиксации текущей транзакции, чтобы в кэш не попали данные, которые
+    транзакция ещё может откатить.
+    """
+    if product_ids is None:
+        keys = [ALL_PRODUCTS_VERSION_KEY]
+    else:
+        keys = [get_product_version_key(product_id) for product_id in product_ids]
+    if keys:
+        transaction.on_commit(
+            lambda: cache.set_many(dict.fromkeys(keys, new_version()), timeout=None)
+        )
+
+
+def get_stats() -> dict[str, int]:
+    """
+    Количество попаданий в кэш и промахов.
+    """
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    return {
+        "hits": counters.get(HITS_KEY, 0),
+        "misses": counters.get(MISSES_KEY, 0),
+    }
@@ -7,6 +7,7 @@ from .models import (
     PriceType,
     Product,
     ProductMovement,
+    SyncRun,
 )
 
 
@@ -46,6 +47,14 @@ class ProductMovementSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class SyncRunSerializer(serializers.ModelSerializer):
+    duration = serializers.FloatField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = SyncRun
+        fields = "__all__"
+
+
 class ProductAmountSerializer(serializers.Serializer):
     characteristic_id = serializers.UUIDField()
     amount = serializers.IntegerField()
@@ -55,7 +64,38 @@ class ProductPriceSerializer(ProductAmountSerializer):
     price = serializers.IntegerField()
 
 
+class ProductCacheStatsSerializer(serializers.Serializer):
+    hits = serializers.IntegerField()
+    misses = serializers.IntegerField()
+
+
+class ProductPricesQuerySerializer(serializers.Serializer):
+    price_type = serializers.UUIDField(required=False, help_text="Ключ вида цены")
+
+
+class SyncDataQuerySerializer(serializers.Serializer):
+    since = serializers.DateTimeField(
+        required=False,
+        help_text=(
+            "Курсор из ответа предыдущей синхронизации. Если передан, возвращаются "
+            "только изменения после него."
+        ),
+    )
+
+
+class SyncDataDeletedSerializer(serializers.Serializer):
+    barcodes = serializers.ListField(child=serializers.CharField())
+    products = serializers.ListField(child=serializers.CharField())
+    characteristics = serializers.ListField(child=serializers.CharField())
+    price_changes = serializers.ListField(child=serializers.CharField())
+    price_types = serializers.ListField(child=serializers.CharField())
+    product_movements = serializers.ListField(child=serializers.CharField())
+
+
 class SyncDataSerializer(serializers.Serializer):
+    cursor = serializers.DateTimeField()
+    full = serializers.BooleanField()
+    deleted = SyncDataDeletedSerializer()
     barcodes = BarcodeSerializer(many=True)
     products = ProductSerializer(many=True)
     characteristics = CharacteristicSerializer(many=True)
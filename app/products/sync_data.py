@@ -0,0 +1,185 @@
+"""
+Выгрузка данных по всем таблицам для синхронизации мобильных клиентов.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from typing import Iterator
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import (
+    Barcode,
+    Characteristic,
+    PriceChange,
+    PriceType,
+    Product,
+    ProductMovement,
+    Tombstone,
+)
+from .serializers import (
+    BarcodeSerializer,
+    CharacteristicSerializer,
+    PriceChangeSerializer,
+    PriceTypeSerializer,
+    ProductMovementSerializer,
+    ProductSerializer,
+)
+
+# Ключ в ответе синхронизации, модель и сериализатор для каждой таблицы
+SYNC_DATA_TABLES = (
+    ("barcodes", Barcode, BarcodeSerializer),
+    ("characteristics", Characteristic, CharacteristicSerializer),
+    ("price_changes", PriceChange, PriceChangeSerializer),
+    ("price_types", PriceType, PriceTypeSerializer),
+    ("product_movements", ProductMovement, ProductMovementSerializer),
+    ("products", Product, ProductSerializer),
+)
+
+# Так же, как JSONRenderer DRF с настройками по умолчанию
+json_encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def get_columns(
+    serializer_class: type[serializers.ModelSerializer],
+) -> list[tuple[str, str, serializers.Field | None]]:
+    """
+    Колонки таблицы для выгрузки: название поля в ответе, название колонки в БД
+    и поле сериализатора для преобразования значения. Для связанных объектов
+    выгружается ключ, как в ``PrimaryKeyRelatedField``.
+    """
+    model = serializer_class.Meta.model
+    columns = []
+    for name, field in serializer_class().fields.items():
+        attname = model._meta.get_field(field.source).attname
+        if isinstance(field, serializers.RelatedField):
+            columns.append((name, attname, None))
+        else:
+            columns.append((name, attname, field))
+    return columns
+
+
+def iter_table_json(
+    model: type, serializer_class: type[serializers.ModelSerializer], chunk_size: int
+) -> Iterator[str]:
+    """
+    Объекты таблицы в JSON, так же как их выдал бы ``serializer_class``.
+    Строки читаются серверным курсором, поэтому таблица не загружается в память.
+    """
+    columns = get_columns(serializer_class)
+    rows = (
+        model.objects.order_by()
+        .values_list(*[attname for _, attname, _ in columns])
+        .iterator(chunk_size=chunk_size)
+    )
+
+    chunk = []
+    for row in rows:
+        row_data = {}
+        for (name, _, field), value in zip(columns, row):
+            if field is not None and value is not None:
+                value = field.to_representation(value)
+            row_data[name] = value
+        chunk.append(json_encoder.encode(row_data))
+        if len(chunk) == chunk_size:
+            yield ",".join(chunk)
+            chunk = []
+    if chunk:
+        yield ",".join(chunk)
+
+
+def iter_sync_data_json(cursor: str) -> Iterator[bytes]:
+    """
+    Полная выгрузка данных синхронизации в JSON по частям.
+    """
+    chunk_size = settings.SYNC_DATA_CHUNK_SIZE
+    deleted = {key: [] for key, _, _ in SYNC_DATA_TABLES}
+    yield (
+        f'{{"cursor":{json_encoder.encode(cursor)},"full":true,'
+        f'"deleted":{json_encoder.encode(deleted)}'
+    ).encode()
+    for key, model, serializer_class in SYNC_DATA_TABLES:
+        yield f',"{key}":['.encode()
+        for i, chunk in enumerate(iter_table_json(model, serializer_class, chunk_size)):
+            yield f",{chunk}".encode() if i else chunk.encode()
+        yield b"]"
+    yield b"}"
+
+
+def get_data_version() -> str:
+    """
+    Метка последнего изменения данных синхронизации: время последнего обновления
+    объекта или удаления.
+    """
+    timestamps = [
+        model.objects.aggregate(last=Max("updated_at"))["last"]
+        for _, model, _ in SYNC_DATA_TABLES
+    ]
+    timestamps.append(Tombstone.objects.aggregate(last=Max("deleted_at"))["last"])
+    return max(
+        (timestamp.isoformat() for timestamp in timestamps if timestamp), default=""
+    )
+
+
+def get_snapshot() -> dict | None:
+    """
+    Описание последнего снимка полной выгрузки: ETag, курсор, метка данных
+    и путь к сжатому файлу. ``None``, если снимок ещё не построен.
+    """
+    try:
+        with open(settings.SYNC_DATA_SNAPSHOT_DIR / "snapshot.json") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    snapshot["path"] = settings.SYNC_DATA_SNAPSHOT_DIR / snapshot["file_name"]
+    return snapshot
+
+
+def build_snapshot() -> str:
+    """
+    Строит сжатый gzip снимок полной выгрузки данных синхронизации, если данные
+    изменились с прошлого снимка.
+    """
+    data_version = get_data_version()
+    previous_snapshot = get_snapshot()
+    if previous_snapshot and previous_snapshot["data_version"] == data_version:
+        return "Snapshot is up to date"
+
+    snapshot_dir = settings.SYNC_DATA_SNAPSHOT_DIR
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    cursor = serializers.DateTimeField().to_representation(timezone.now())
+
+    content_hash = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=snapshot_dir, delete=False) as tmp_file:
+        with gzip.GzipFile(fileobj=tmp_file, mode="wb") as gzip_file:
+            for chunk in iter_sync_data_json(cursor):
+                content_hash.update(chunk)
+                gzip_file.write(chunk)
+    etag = content_hash.hexdigest()
+    file_name = f"sync-data-{etag}.json.gz"
+    os.replace(tmp_file.name, snapshot_dir / file_name)
+
+    # Описание снимка заменяется атомарно, поэтому читатели всегда видят
+    # целый файл. Уже открытые старые файлы дочитываются после удаления.
+    snapshot = {
+        "etag": etag,
+        "cursor": cursor,
+        "data_version": data_version,
+        "file_name": file_name,
+    }
+    with tempfile.NamedTemporaryFile(
+        "w", dir=snapshot_dir, delete=False, suffix=".json"
+    ) as tmp_file:
+        json.dump(snapshot, tmp_file)
+    os.replace(tmp_file.name, snapshot_dir / "snapshot.json")
+
+    if previous_snapshot and previous_snapshot["file_name"] != file_name:
+        previous_snapshot["path"].unlink(missing_ok=True)
+    return f"Snapshot {etag} built"
@@ -1,23 +1,118 @@
-from typing import Callable, Type, TypeVar
+import hashlib
+import itertools
+import json
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Callable, Iterable, Iterator, Type, TypeVar
 
-from django.db import transaction
-from django.db.models import Model, Q
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Model
+from django.utils import timezone
 from onec_client import OneCODataClient
+from products.models import SyncState, Tombstone
 
 client = OneCODataClient()
 ModelSubclass = TypeVar("ModelSubclass", bound=Model)
+# Порция объектов от 1с по столбцам: поле 1с → значения поля у объектов
+Columns = dict[str, list]
+
+# Пустой результат синхронизации, когда данные от 1с не изменились
+UNCHANGED_RESULT = "0 created, 0 updated, 0 deleted (unchanged)"
+
+# Экранирование спецсимволов текстового формата COPY
+COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def to_copy_value(value) -> str:
+    """
+    Значение колонки в текстовом формате COPY.
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return str(value).translate(COPY_ESCAPES)
+
+
+def get_key_hash(values: Iterable) -> int:
+    """
+    Хэш ключа объекта для сопоставления объектов от 1с с объектами в БД Джанго.
+    Время с часовым поясом переводится в UTC, чтобы равное время из БД
+    и от 1с давало одинаковый хэш.
+
+    128 бит хватает, чтобы совпадение хэшей разных ключей было практически
+    невозможным, а число занимает меньше памяти, чем кортеж из UUID и дат.
+    """
+    values = tuple(
+        value.astimezone(dt_timezone.utc)
+        if isinstance(value, datetime) and value.tzinfo is not None
+        else value
+        for value in values
+    )
+    key_hash = hashlib.blake2b(repr(values).encode(), digest_size=16).digest()
+    return int.from_bytes(key_hash, "big")
+
+
+def get_odata_select(
+    fields_mapping: dict[str, str],
+    primary_key_name: str | None = None,
+    nested_key: str | None = None,
+    extra_fields: Iterable[str] = (),
+) -> str:
+    """
+    Значение ``$select`` для запроса к 1с: только поля, которые использует
+    синхронизатор. ``extra_fields`` — поля, которые нужны функции предобработки.
+    """
+    odata_fields = list(fields_mapping.values())
+    if primary_key_name:
+        odata_fields.append(primary_key_name)
+    odata_fields.extend(extra_fields)
+    # Поля без повторов в исходном порядке
+    odata_fields = list(dict.fromkeys(odata_fields))
+    if nested_key:
+        odata_fields = [f"{nested_key}/{field}" for field in odata_fields]
+    return ",".join(odata_fields)
+
+
+class CopyRowsFile:
+    """
+    Файлоподобный объект для ``COPY ... FROM STDIN``, который читает строки
+    из итератора, не собирая все данные в памяти.
+    """
+
+    def __init__(self, lines: Iterator[str]) -> None:
+        self.lines = lines
+        self.buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self.buffer) < size:
+            line = next(self.lines, None)
+            if line is None:
+                break
+            self.buffer += line.encode()
+        if size < 0:
+            size = len(self.buffer)
+        data = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return data
 
 
 class ODataToDjangoDataSyncer:
     def __init__(
         self,
         model: Type[ModelSubclass],
-        objects_odata: list[dict],
+        objects_odata: Iterable[dict],
         fields_mapping: dict[str, str],
         primary_key_name: str | None = None,
         nested_key: str | None = None,
         update: bool = True,
         preproc_function: Callable[[dict], dict] | None = None,
+        batch_preproc_function: Callable[[Columns], Columns] | None = None,
+        postproc_function: Callable[[list[Model], list[Model]], None] | None = None,
+        scope: dict | None = None,
+        state_entity: str | None = None,
+        chunk_size: int | None = None,
     ) -> None:
         """
         :param objects_odata: Данные по объектам от 1c.
@@ -30,6 +125,20 @@ class ODataToDjangoDataSyncer:
         :param update: Нужно ли обновлять данные по существующим объектам?
         :preproc_function: Функция, которую нужно применить для предобработки
         данных от 1с
+        :batch_preproc_function: Функция предобработки порции объектов от 1с
+        по столбцам: получает и возвращает словарь «поле 1с → список значений».
+        Если передана, ``preproc_function`` не используется.
+        :postproc_function: Функция, которая вызывается в транзакции синхронизации
+        со списками сохранённых и удалённых объектов.
+        :param scope: Фильтр объектов в БД Джанго, которые покрывают данные от 1с,
+        например, ``{"period__gte": since}`` при инкрементальной загрузке. Объекты
+        вне фильтра не сопоставляются и не удаляются.
+        :param state_entity: Сущность 1с в ``SyncState``. Если передана, данные
+        от 1с не изменились с прошлой синхронизации и БД Джанго с ними совпадает,
+        синхронизация отмечается как ``unchanged``.
+        :param chunk_size: Сколько созданных и обновлённых объектов сохраняется
+        в одной транзакции. Объекты сохраняются по мере загрузки от 1с, поэтому
+        в памяти одновременно не больше ``chunk_size`` объектов модели.
         """
         self.model = model
         self.objects_odata = objects_odata
@@ -38,114 +147,464 @@ class ODataToDjangoDataSyncer:
         self.nested_key = nested_key
         self.update = update
         self.preproc_function = preproc_function
+        self.batch_preproc_function = batch_preproc_function
+        self.postproc_function = postproc_function
+        self.scope = scope or {}
+        self.state_entity = state_entity
+        self.chunk_size = chunk_size or settings.ONEC_SYNC_CHUNK_SIZE
+
+        # Сумма хэшей объектов от 1с и их количество для хэша данных
+        self.payload_digest = 0
+        self.payload_count = 0
+        self.payload_hash = None
+
+        # Время этапов синхронизации в секундах и количество объектов
+        self.stats = {
+            "fetch_time": 0.0,
+            "parse_time": 0.0,
+            "write_time": 0.0,
+            "created": 0,
+            "updated": 0,
+            "deleted": 0,
+            "unchanged": False,
+        }
 
         self.natural_keys_mapping = None
 
-        self.created_objects = []
-        self.updated_objects = []
+        # Хэш ключа объекта → (PK, хэш значений обновляемых полей) для объектов
+        # в БД Джанго. Если объекты не обновляются, значения не загружаются.
+        self.existing_objects = {}
+        # Хэш ключа объекта → объект, который нужно создать или обновить
+        # в следующей порции
+        self.created_objects = {}
+        self.updated_objects = {}
+        # Хэши ключей объектов, сохранённых в предыдущих порциях
+        self.saved_keys = set()
         self.seen_ids = set()
 
         if not self.primary_key_name:
             # Если не передали первичный ключ, получаем поля для естественного ключа
             self.set_natural_keys_mapping()
 
+        self.key_fields = self.get_key_fields()
+        self.update_fields = self.get_update_fields()
+
     def set_natural_keys_mapping(self) -> None:
         natural_keys_mapping = self.fields_mapping.copy()
         for key in self.model.NOT_NATURAL_KEYS:
             natural_keys_mapping.pop(key)
         self.natural_keys_mapping = natural_keys_mapping
 
-    def get_natural_keys_query(self, object_odata: dict) -> Q:
+    def get_key_fields(self) -> list[str]:
         """
-        Получает запрос Джанго ORM для получения объекта из БД по значению
-        его естественных ключей.
+        Поля, по которым объект от 1с сопоставляется с объектом в БД Джанго:
+        первичный ключ или поля естественного ключа.
         """
-        query = Q()
-        for django_field_name in self.natural_keys_mapping:
-            odata_field_value = object_odata[
-                self.natural_keys_mapping[django_field_name]
-            ]
-            query &= Q(**{django_field_name: odata_field_value})
-        return query
+        if self.primary_key_name:
+            return [self.model._meta.pk.name]
+        return list(self.natural_keys_mapping.keys())
 
-    def sync_one_object(
-        self,
-        object_odata: dict,
-    ) -> None:
+    def get_update_fields(self) -> list[str]:
+        # Нет смысла обновлять значения полей, по которым мы сопоставляем объекты
+        return [
+            field
+            for field in self.fields_mapping.keys()
+            if field not in self.key_fields
+        ]
+
+    def load_existing_objects(self) -> None:
+        """
+        Загружает ключи и значения обновляемых полей всех объектов из БД Джанго
+        одним запросом, чтобы не искать каждый объект от 1с отдельным запросом.
+        Ключи и значения хранятся хэшами, чтобы в памяти не держать сами значения.
+        """
+        key_end = len(self.key_fields) + 1
+        compared_fields = self.update_fields if self.update else []
+        rows = (
+            self.model.objects.filter(**self.scope)
+            .order_by()
+            .values_list("pk", *self.key_fields, *compared_fields)
+            .iterator(chunk_size=10000)
+        )
+        for row in rows:
+            self.existing_objects[get_key_hash(row[1:key_end])] = (
+                row[0],
+                get_key_hash(row[key_end:]) if self.update else None,
+            )
+
+    def iter_objects_odata(self) -> Iterator[dict]:
+        """
+        Перебирает объекты от 1с, в том числе вложенные по ``nested_key``.
+        """
+        objects_odata = iter(self.objects_odata)
+        while True:
+            # Время ожидания следующего объекта — время загрузки из 1с
+            fetch_started = time.perf_counter()
+            object_odata = next(objects_odata, None)
+            self.stats["fetch_time"] += time.perf_counter() - fetch_started
+            if object_odata is None:
+                return
+
+            nested_objects_odata = (
+                object_odata[self.nested_key] if self.nested_key else [object_odata]
+            )
+            for nested_object_odata in nested_objects_odata:
+                if self.state_entity:
+                    self.update_payload_hash(nested_object_odata)
+                yield nested_object_odata
+
+    def update_payload_hash(self, object_odata: dict) -> None:
+        """
+        Добавляет объект от 1с к хэшу данных. Хэш данных — сумма хэшей объектов,
+        поэтому не зависит от порядка, в котором 1с их вернула.
+        """
+        object_json = json.dumps(
+            object_odata, sort_keys=True, ensure_ascii=False, default=str
+        )
+        object_hash = hashlib.blake2b(object_json.encode(), digest_size=32).digest()
+        self.payload_digest = (
+            self.payload_digest + int.from_bytes(object_hash, "big")
+        ) % 2**256
+        self.payload_count += 1
+
+    def is_payload_unchanged(self) -> bool:
+        """
+        Совпадает ли хэш данных от 1с с сохранённым при прошлой синхронизации.
+        Вызывается после перебора всех объектов.
+        """
+        if not self.state_entity:
+            return False
+        payload = (
+            self.payload_count,
+            self.payload_digest,
+            self.fields_mapping,
+            sorted(self.scope.items()),
+        )
+        self.payload_hash = hashlib.blake2b(
+            repr(payload).encode(), digest_size=32
+        ).hexdigest()
+        return SyncState.objects.get_payload_hash(self.state_entity) == (
+            self.payload_hash
+        )
+
+    def save_payload_hash(self) -> None:
+        if self.state_entity:
+            SyncState.objects.set_payload_hash(self.state_entity, self.payload_hash)
+
+    def get_django_object_data(self, object_odata: dict) -> dict:
+        """
+        Значения полей модели Джанго для объекта от 1с.
+        """
+        parse_started = time.perf_counter()
         if self.preproc_function:
             object_odata = self.preproc_function(object_odata)
 
-        # Проверяем, какую операцию нужно выполнить: создание или обновление
-        if self.primary_key_name:
-            # При получении объекта из БД Джанго по первичному ключу, нам достаточно
-            # знать, существует ли такой объект
-            object_pk = object_odata.get(self.primary_key_name)
-            django_object = self.model.objects.filter(pk=object_pk).exists()
-        else:
-            # При получении объекта из БД Джанго по естественным ключам,
-            # нужно узнать ещё ID объекта в БД Джанго.
-            query = self.get_natural_keys_query(object_odata)
-            django_object = self.model.objects.filter(query).values("id")
-
         django_object_data = {}
         for django_field_name, onec_field_name in self.fields_mapping.items():
-            django_object_data[django_field_name] = object_odata.get(onec_field_name)
+            # Приводим значения от 1с к типам полей модели (например, строки к UUID)
+            field = self.model._meta.get_field(django_field_name)
+            django_object_data[django_field_name] = field.to_python(
+                object_odata.get(onec_field_name)
+            )
+        self.stats["parse_time"] += time.perf_counter() - parse_started
+        return django_object_data
+
+    def get_django_rows(self, objects_odata: list[dict]) -> list[tuple]:
+        """
+        Значения полей модели Джанго для порции объектов от 1с в порядке
+        ``fields_mapping``. Предобработка и приведение типов выполняются
+        по столбцам, без словаря на каждый объект.
+        """
+        parse_started = time.perf_counter()
+        onec_field_names = dict.fromkeys(
+            [*objects_odata[0], *self.fields_mapping.values()]
+        )
+        columns = {
+            onec_field_name: [
+                object_odata.get(onec_field_name) for object_odata in objects_odata
+            ]
+            for onec_field_name in onec_field_names
+        }
+        columns = self.batch_preproc_function(columns)
+
+        django_columns = []
+        for django_field_name, onec_field_name in self.fields_mapping.items():
+            field = self.model._meta.get_field(django_field_name)
+            django_columns.append(list(map(field.to_python, columns[onec_field_name])))
+        rows = list(zip(*django_columns))
+        self.stats["parse_time"] += time.perf_counter() - parse_started
+        return rows
+
+    def iter_django_rows(self) -> Iterator[tuple]:
+        """
+        Перебирает значения полей модели Джанго для объектов от 1с в порядке
+        ``fields_mapping``. С ``batch_preproc_function`` объекты разбираются
+        порциями по ``chunk_size``.
+        """
+        objects_odata = self.iter_objects_odata()
+        if not self.batch_preproc_function:
+            for object_odata in objects_odata:
+                yield tuple(self.get_django_object_data(object_odata).values())
+            return
 
+        while True:
+            batch = list(itertools.islice(objects_odata, self.chunk_size))
+            if not batch:
+                return
+            yield from self.get_django_rows(batch)
+
+    def sync_one_object(self, django_object_data: dict) -> None:
+        object_key = get_key_hash(
+            django_object_data[django_field_name]
+            for django_field_name in self.key_fields
+        )
         object_instance = self.model(**django_object_data)
 
-        if django_object:
-            if not self.primary_key_name:
-                object_pk = django_object[0]["id"]
-                object_instance.pk = object_pk
+        # Проверяем, какую операцию нужно выполнить: создание или обновление.
+        # Одинаковые записи от 1с сохраняем только один раз.
+        if object_key in self.saved_keys:
+            return
+        existing_object = self.existing_objects.get(object_key)
+        if existing_object is None:
+            self.created_objects[object_key] = object_instance
+            return
 
-            self.updated_objects.append(object_instance)
-            self.seen_ids.add(object_pk)
-        else:
-            self.created_objects.append(object_instance)
+        object_pk, db_values_hash = existing_object
+        # Объект есть и в 1с, и в БД Джанго, поэтому не удаляется, даже если
+        # объекты не обновляются
+        self.seen_ids.add(object_pk)
+        if not self.update:
+            return
+        # Объекты, данные которых не изменились, не обновляем
+        odata_values_hash = get_key_hash(
+            django_object_data[django_field_name]
+            for django_field_name in self.update_fields
+        )
+        if odata_values_hash != db_values_hash:
+            self.updated_objects[object_key] = object_instance
 
     def sync_objects(self) -> str:
         """
-        Синхронизирует данные в БД Джанго и от API 1C.
+        Синхронизирует данные в БД Джанго и от API 1C. Время этапов
+        и количество объектов сохраняются в ``stats``.
         """
+        started = time.perf_counter()
+        try:
+            self.run_sync()
+        finally:
+            # Всё, кроме загрузки и разбора данных от 1с, — работа с БД
+            self.stats["write_time"] = (
+                time.perf_counter()
+                - started
+                - self.stats["fetch_time"]
+                - self.stats["parse_time"]
+            )
+        return self.get_result()
 
-        for object_odata in self.objects_odata:
-            if self.nested_key:
-                nested_objects_odata = object_odata[self.nested_key]
-                for nested_object_odata in nested_objects_odata:
-                    self.sync_one_object(nested_object_odata)
-            else:
-                self.sync_one_object(object_odata)
+    def get_result(self) -> str:
+        if self.stats["unchanged"]:
+            return UNCHANGED_RESULT
+        return (
+            f"{self.stats['created']} created, {self.stats['updated']} updated, "
+            f"{self.stats['deleted']} deleted"
+        )
+
+    def run_sync(self) -> None:
+        self.load_existing_objects()
+
+        for row in self.iter_django_rows():
+            self.sync_one_object(dict(zip(self.fields_mapping, row)))
+            if len(self.created_objects) + len(self.updated_objects) >= self.chunk_size:
+                self.save_chunk()
+
+        deleted_ids = self.get_deleted_ids()
+        # Пропускаем запись, только если данные от 1с не изменились и БД Джанго
+        # с ними совпадает: объекты могли изменить или каскадно удалить в БД
+        has_changes = (
+            self.created_objects
+            or self.updated_objects
+            or self.saved_keys
+            or deleted_ids
+        )
+        if self.is_payload_unchanged() and not has_changes:
+            self.stats["unchanged"] = True
+            return
+
+        self.save_chunk()
+        self.delete_objects(deleted_ids)
+        self.save_payload_hash()
+
+    def save_chunk(self) -> None:
+        """
+        Сохраняет накопленные объекты в отдельной транзакции вместе с функцией
+        постобработки и освобождает память под них.
+        """
+        created_objects = list(self.created_objects.values())
+        updated_objects = list(self.updated_objects.values())
+        if not created_objects and not updated_objects:
+            return
 
-        updated_count = 0
         with transaction.atomic():
+            self.save_objects(created_objects, updated_objects)
+            if self.postproc_function:
+                self.postproc_function(created_objects + updated_objects, [])
+
+        self.stats["created"] += len(created_objects)
+        self.stats["updated"] += len(updated_objects)
+        self.saved_keys.update(self.created_objects)
+        self.saved_keys.update(self.updated_objects)
+        self.created_objects.clear()
+        self.updated_objects.clear()
 
-            if self.update:
-                update_fields = list(self.fields_mapping.keys())
-
-                # через .bulk_update() нельзя обновлять PK
-                if self.primary_key_name:
-                    update_fields.remove(self.model._meta.pk.name)
-                else:
-                    # Нет смысла обновлять значения полей, которые мы использовали
-                    # для получения по естественному ключу
-                    update_fields = [
-                        field
-                        for field in update_fields
-                        if field not in self.natural_keys_mapping.keys()
-                    ]
-
-                updated_count = self.model.objects.bulk_update(
-                    self.updated_objects, update_fields, batch_size=1000
-                )
-
-            deleted_count = self.model.objects.filter(
-                ~Q(pk__in=self.seen_ids)
-            ).delete()[0]
-            created_count = len(
-                self.model.objects.bulk_create(
-                    self.created_objects, ignore_conflicts=True
-                )
+    def get_deleted_ids(self) -> list:
+        """
+        PK объектов в БД Джанго, которых больше нет в 1с.
+        """
+        return [
+            object_pk
+            for object_pk, _ in self.existing_objects.values()
+            if object_pk not in self.seen_ids
+        ]
+
+    def delete_objects(self, deleted_ids: list) -> None:
+        """
+        Удаляет из БД Джанго объекты ``deleted_ids`` и записывает их удаление.
+        Объекты удаляются порциями по ``chunk_size``, каждая в своей транзакции
+        вместе с функцией постобработки.
+        """
+        for batch_start in range(0, len(deleted_ids), self.chunk_size):
+            batch_end = batch_start + self.chunk_size
+            batch_ids = deleted_ids[batch_start:batch_end]
+            with transaction.atomic():
+                deleted_objects = []
+                if self.postproc_function:
+                    deleted_objects = list(self.model.objects.filter(pk__in=batch_ids))
+                deleted_count, _ = self.model.objects.filter(pk__in=batch_ids).delete()
+                Tombstone.objects.record(self.model, batch_ids)
+                if self.postproc_function:
+                    self.postproc_function([], deleted_objects)
+            self.stats["deleted"] += deleted_count
+
+    def save_objects(
+        self, created_objects: list[Model], updated_objects: list[Model]
+    ) -> None:
+        if self.update and self.update_fields:
+            # Создаём и обновляем объекты через INSERT ... ON CONFLICT DO UPDATE
+            self.model.objects.bulk_create(
+                created_objects + updated_objects,
+                update_conflicts=True,
+                unique_fields=self.key_fields,
+                update_fields=self.update_fields + ["updated_at"],
+                batch_size=1000,
             )
-        return (
-            f"{created_count} created, {updated_count} updated, {deleted_count} deleted"
+        else:
+            self.model.objects.bulk_create(
+                created_objects, ignore_conflicts=True, batch_size=1000
+            )
+
+
+class ODataToDjangoCopySyncer(ODataToDjangoDataSyncer):
+    """
+    Синхронизатор для больших регистров 1с. Объекты от 1с потоком загружаются
+    во временную таблицу через ``COPY ... FROM STDIN`` и сливаются с таблицей
+    модели двумя запросами: ``DELETE ... WHERE NOT EXISTS`` и
+    ``INSERT ... SELECT ... ON CONFLICT``.
+
+    Удаление выполняется напрямую в БД, без каскада Джанго, поэтому синхронизатор
+    подходит только для моделей, на которые не ссылаются другие модели.
+    """
+
+    def iter_copy_rows(self) -> Iterator[str]:
+        for row in self.iter_django_rows():
+            yield "\t".join(map(to_copy_value, row)) + "\n"
+
+    def get_instance(self, row: tuple) -> Model:
+        """
+        Объект модели по строке ``RETURNING pk, поля fields_mapping``.
+        """
+        object_instance = self.model(**dict(zip(self.fields_mapping.keys(), row[1:])))
+        object_instance.pk = row[0]
+        return object_instance
+
+    def run_sync(self) -> None:
+        quote_name = connection.ops.quote_name
+        opts = self.model._meta
+
+        def get_columns(field_names: list[str]) -> list[str]:
+            return [quote_name(opts.get_field(name).column) for name in field_names]
+
+        table = quote_name(opts.db_table)
+        staging_table = quote_name(f"sync_staging_{opts.model_name}")
+        pk_column = quote_name(opts.pk.column)
+        updated_at_column = quote_name(opts.get_field("updated_at").column)
+        columns = get_columns(list(self.fields_mapping.keys()))
+        key_columns = get_columns(self.key_fields)
+        update_columns = get_columns(self.update_fields)
+
+        returning = ", ".join([f"t.{pk_column}"] + [f"t.{c}" for c in columns])
+        key_match = " AND ".join(f"s.{c} = t.{c}" for c in key_columns)
+        if self.update and update_columns:
+            updated_columns = ", ".join(f"t.{c}" for c in update_columns)
+            excluded_columns = ", ".join(f"EXCLUDED.{c}" for c in update_columns)
+            on_conflict = (
+                "DO UPDATE SET "
+                + ", ".join(f"{c} = EXCLUDED.{c}" for c in update_columns)
+                + f", {updated_at_column} = EXCLUDED.{updated_at_column} "
+                # Объекты, данные которых не изменились, не обновляем
+                + f"WHERE ({updated_columns}) IS DISTINCT FROM ({excluded_columns})"
+            )
+        else:
+            on_conflict = "DO NOTHING"
+
+        scope_sql, scope_params = "", []
+        if self.scope:
+            scope_query = self.model.objects.filter(**self.scope).values("pk").query
+            scope_query_sql, scope_params = scope_query.sql_with_params()
+            scope_sql = f"AND t.{pk_column} IN ({scope_query_sql})"
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+            cursor.execute(
+                f"CREATE TEMP TABLE {staging_table} ON COMMIT DROP AS "
+                f"SELECT {', '.join(columns)} FROM {table} WITH NO DATA"
+            )
+            cursor.copy_expert(
+                f"COPY {staging_table} ({', '.join(columns)}) FROM STDIN",
+                CopyRowsFile(self.iter_copy_rows()),
+            )
+            # Слияние выполняется, даже если данные от 1с не изменились: записи
+            # в БД Джанго могли изменить или каскадно удалить
+            payload_unchanged = self.is_payload_unchanged()
+            cursor.execute(f"ANALYZE {staging_table}")
+
+            cursor.execute(
+                f"DELETE FROM {table} AS t WHERE NOT EXISTS "
+                f"(SELECT 1 FROM {staging_table} AS s WHERE {key_match}) "
+                f"{scope_sql} RETURNING {returning}",
+                scope_params,
+            )
+            deleted_objects = [self.get_instance(row) for row in cursor.fetchall()]
+            Tombstone.objects.record(self.model, [obj.pk for obj in deleted_objects])
+
+            # Одинаковые записи от 1с сохраняем только один раз
+            cursor.execute(
+                f"INSERT INTO {table} AS t ({', '.join(columns)}, {updated_at_column}) "
+                f"SELECT DISTINCT ON ({', '.join(key_columns)}) "
+                f"{', '.join(columns)}, %s FROM {staging_table} "
+                f"ON CONFLICT ({', '.join(key_columns)}) {on_conflict} "
+                f"RETURNING {returning}, (t.xmax = 0)",
+                [timezone.now()],
+            )
+            saved_rows = cursor.fetchall()
+            saved_objects = [self.get_instance(row[:-1]) for row in saved_rows]
+
+            if self.postproc_function:
+                self.postproc_function(saved_objects, deleted_objects)
+            self.save_payload_hash()
+
+        self.stats["created"] = sum(1 for row in saved_rows if row[-1])
+        self.stats["updated"] = len(saved_rows) - self.stats["created"]
+        self.stats["deleted"] = len(deleted_objects)
+        self.stats["unchanged"] = payload_unchanged and not (
+            saved_rows or deleted_objects
         )
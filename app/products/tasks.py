@@ -3,39 +3,381 @@
 """
 
 
-from dateutil import parser
+import asyncio
+import time
+import traceback
+import uuid
+from datetime import datetime
+from typing import Iterable
+
+from celery import chord
+from celery.utils.log import get_task_logger
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
 from django.utils import timezone
-from onec_client import OneCODataClient
+from onec_client import (
+    AsyncOneCODataClient,
+    OneCODataClient,
+    get_period_bounds,
+    get_period_filter,
+    get_period_partitions,
+    parse_odata_datetime,
+)
 from products.models import (
     Barcode,
     Characteristic,
+    CurrentPrice,
     PriceChange,
     PriceType,
     Product,
     ProductMovement,
+    StockBalance,
+    SyncRun,
+    SyncState,
+)
+from products.product_cache import invalidate_products
+from products.sync_data import build_snapshot
+from products.syncer import (
+    ODataToDjangoCopySyncer,
+    ODataToDjangoDataSyncer,
+    get_odata_select,
 )
-from products.syncer import ODataToDjangoDataSyncer
 
 from app.celery import app
 
 client = OneCODataClient()
+logger = get_task_logger(__name__)
+
+
+def preproc_periods(columns: dict[str, list]) -> dict[str, list]:
+    """
+    Переводит время и дату из строк в ``datetime.datetime``
+    """
+    columns["Period"] = list(map(parse_odata_datetime, columns["Period"]))
+    return columns
+
+
+def preproc_product_movements(columns: dict[str, list]) -> dict[str, list]:
+    columns = preproc_periods(columns)
+    columns["Количество"] = [
+        -amount if record_type == "Expense" else amount
+        for amount, record_type in zip(columns["Количество"], columns["RecordType"])
+    ]
+    return columns
+
+
+def rebuild_current_prices(
+    product_ids: Iterable[uuid.UUID], since: datetime | None
+) -> None:
+    """
+    Пересчитывает текущие цены после синхронизации изменений цен по частям.
+
+    Пересчитываются цены товаров, изменения цен которых сохранили или удалили
+    части, и товаров с изменениями цен с ``since``: если прошлая синхронизация
+    прервалась, её части могли сохранить изменения без пересчёта цен.
+    """
+    if since is None:
+        CurrentPrice.objects.rebuild()
+        return
+    product_ids = {
+        *product_ids,
+        *PriceChange.objects.filter(period__gte=since)
+        .values_list("product_id", flat=True)
+        .distinct(),
+    }
+    CurrentPrice.objects.rebuild(sorted(product_ids))
+
+
+# Сущности 1с для синхронизации в порядке зависимостей: запрос к 1с, параметры
+# синхронизатора и, для регистров, параметры инкрементальной загрузки по Period
+SYNC_ENTITIES = {
+    "products": {
+        "request": {
+            "odata_entity": "Catalog_Номенклатура",
+            "odata_filter": "IsFolder eq false",
+            "odata_orderby": "Ref_Key",
+            "use_cache": True,
+        },
+        "syncer": {
+            "model": Product,
+            "fields_mapping": {
+                "ref_key": "Ref_Key",
+                "name": "Description",
+                "sku": "Артикул",
+            },
+            "primary_key_name": "Ref_Key",
+        },
+    },
+    "price_types": {
+        "request": {
+            "odata_entity": "Catalog_ВидыЦен",
+            "odata_orderby": "Ref_Key",
+            "use_cache": True,
+        },
+        "syncer": {
+            "model": PriceType,
+            "fields_mapping": {"ref_key": "Ref_Key", "name": "Description"},
+            "primary_key_name": "Ref_Key",
+        },
+    },
+    "characteristics": {
+        "request": {
+            "odata_entity": "Catalog_ХарактеристикиНоменклатуры",
+            "odata_orderby": "Ref_Key",
+            "use_cache": True,
+        },
+        "syncer": {
+            "model": Characteristic,
+            "fields_mapping": {"ref_key": "Ref_Key", "name": "Description"},
+            "primary_key_name": "Ref_Key",
+        },
+    },
+    "barcodes": {
+        "request": {
+            "odata_entity": "InformationRegister_Штрихкоды",
+            "odata_orderby": "Штрихкод,Владелец,Характеристика_Key",
+            "use_cache": True,
+        },
+        "syncer": {
+            "model": Barcode,
+            "fields_mapping": {
+                "barcode": "Штрихкод",
+                "product_id": "Владелец",
+                "characteristic_id": "Характеристика_Key",
+            },
+            "update": False,
+        },
+    },
+    "product_movements": {
+        "request": {
+            "odata_entity": "AccumulationRegister_ТоварыНаСкладах_RecordType",
+            "odata_filter": (
+                "Recorder_Type eq 'StandardODATA.Document_ВозвратТоваровОтПокупателя'"
+            ),
+            "odata_orderby": "Recorder,LineNumber",
+        },
+        "syncer": {
+            "model": ProductMovement,
+            "fields_mapping": {
+                "product_id": "Номенклатура_Key",
+                "characteristic_id": "Характеристика_Key",
+                "amount": "Количество",
+                "period": "Period",
+            },
+            "batch_preproc_function": preproc_product_movements,
+            "postproc_function": StockBalance.objects.apply_movements,
+            "update": False,
+        },
+        "register": {"odata_extra_fields": ("RecordType",)},
+    },
+    "price_changes": {
+        "request": {
+            "odata_entity": "InformationRegister_ЦеныНоменклатуры_RecordType",
+            "odata_orderby": "Recorder,LineNumber",
+        },
+        "syncer": {
+            "model": PriceChange,
+            "fields_mapping": {
+                "product_id": "Номенклатура_Key",
+                "characteristic_id": "Характеристика_Key",
+                "price": "Цена",
+                "period": "Period",
+                "price_type_id": "ВидЦены_Key",
+            },
+            "batch_preproc_function": preproc_periods,
+            "postproc_function": CurrentPrice.objects.apply_price_changes,
+            "update": False,
+        },
+        # Пересчёт текущих цен одного товара из разных частей синхронизации
+        # мог бы выполняться одновременно, поэтому при синхронизации по частям
+        # он выполняется один раз после всех частей
+        "register": {"shard_postproc": rebuild_current_prices},
+    },
+}
+
+
+def get_first_period(records_entity: str, odata_filter: str | None) -> datetime | None:
+    """
+    Время первой записи регистра 1с или ``None``, если записей нет.
+    """
+    objects_odata = client.get(
+        records_entity,
+        odata_filter=odata_filter,
+        odata_select="Period",
+        odata_count=1,
+        odata_orderby="Period",
+    )["value"]
+    if not objects_odata:
+        return None
+    return parse_odata_datetime(objects_odata[0]["Period"])
+
+
+def get_entity_request(name: str) -> dict:
+    """
+    Параметры запроса всех объектов сущности ``name`` к 1с
+    для ``iter_entities_partitioned``.
+    """
+    sync_entity = SYNC_ENTITIES[name]
+    request = sync_entity["request"].copy()
+    register = sync_entity.get("register")
+    request["odata_select"] = get_odata_select(
+        sync_entity["syncer"]["fields_mapping"],
+        primary_key_name=sync_entity["syncer"].get("primary_key_name"),
+        extra_fields=register.get("odata_extra_fields", ()) if register else (),
+    )
+    request["partition_filters"] = [None]
+    return request
+
+
+def get_sync_request(name: str) -> tuple[dict, datetime | None]:
+    """
+    Параметры запроса объектов сущности ``name`` к 1с для
+    ``iter_entities_partitioned`` и время, с которого запрашиваются записи
+    регистра (``None`` — полная загрузка).
+
+    Регистры 1с загружаются по плоской таблице записей ``<регистр>_RecordType``:
+    только записи с ``Period`` не раньше отметки прошлой синхронизации
+    (с перекрытием). Раз в ``ONEC_FULL_SYNC_INTERVAL`` регистр сверяется
+    полностью. Записи делятся на ``ONEC_FETCH_PARTITIONS`` промежутков
+    ``Period``, которые загружаются параллельно.
+    """
+    request = get_entity_request(name)
+    if "register" not in SYNC_ENTITIES[name]:
+        return request, None
+
+    since = SyncState.objects.get_since(request["odata_entity"])
+    odata_filters = [request.get("odata_filter"), get_period_filter(since, None)]
+    request["odata_filter"] = " and ".join(filter(None, odata_filters)) or None
+
+    start = since or get_first_period(request["odata_entity"], request["odata_filter"])
+    if start is not None:
+        request["partition_filters"] = get_period_partitions(
+            start, timezone.now(), settings.ONEC_FETCH_PARTITIONS
+        )
+    return request, since
+
+
+def get_register_shards(
+    name: str,
+) -> tuple[datetime | None, list[tuple[datetime | None, datetime | None]]]:
+    """
+    Время, с которого синхронизируется регистр ``name`` (``None`` — полная
+    загрузка), и ``ONEC_SYNC_SHARDS`` промежутков ``Period`` ``[lower, upper)``
+    для синхронизации по частям. Крайние промежутки открыты.
+    """
+    request = get_entity_request(name)
+    since = SyncState.objects.get_since(request["odata_entity"])
+    start = since or get_first_period(
+        request["odata_entity"], request.get("odata_filter")
+    )
+    bounds = []
+    if start is not None:
+        bounds = get_period_bounds(start, timezone.now(), settings.ONEC_SYNC_SHARDS)
+    return since, list(zip([since, *bounds], [*bounds, None]))
+
+
+def get_period_scope(lower: datetime | None, upper: datetime | None) -> dict:
+    """
+    Фильтр записей регистра в БД Джанго, которые покрывает промежуток
+    ``Period`` ``[lower, upper)`` запроса к 1с.
+    """
+    scope = {}
+    if lower is not None:
+        scope["period__gte"] = lower
+    if upper is not None:
+        scope["period__lt"] = upper
+    return scope
+
 
+def get_syncer(
+    name: str, objects_odata: Iterable[dict], **kwargs
+) -> ODataToDjangoDataSyncer:
+    """
+    Синхронизатор сущности ``name``; ``kwargs`` дополняют параметры
+    из ``SYNC_ENTITIES``.
+    """
+    sync_entity = SYNC_ENTITIES[name]
+    syncer_class = ODataToDjangoDataSyncer
+    if "register" in sync_entity:
+        syncer_class = ODataToDjangoCopySyncer
+    return syncer_class(
+        objects_odata=objects_odata,
+        **{
+            "state_entity": sync_entity["request"]["odata_entity"],
+            **sync_entity["syncer"],
+            **kwargs,
+        },
+    )
 
-def preproc_period(object_odata: dict) -> dict:
+
+def run_syncer(
+    name: str,
+    syncer: ODataToDjangoDataSyncer,
+    onec_client: OneCODataClient | None = None,
+) -> str:
+    """
+    Синхронизирует объекты сущности ``name`` и записывает запуск в ``SyncRun``.
+
+    :param onec_client: Клиент, который загружает объекты от 1с по мере
+    перебора, чтобы записать объём полученных данных.
     """
-    Переводит время и дату из строки в ``datetime.datetime``
+    sync_run = SyncRun(entity=name)
+    bytes_received = onec_client.bytes_received if onec_client else None
+    try:
+        return syncer.sync_objects()
+    except Exception:
+        sync_run.error = traceback.format_exc()
+        raise
+    finally:
+        if onec_client:
+            sync_run.bytes_received = onec_client.bytes_received - bytes_received
+        sync_run.finish(syncer.stats)
+
+
+def mark_register_synced(name: str, since: datetime | None) -> None:
     """
-    object_odata["Period"] = parser.parse(object_odata["Period"]).astimezone(
-        timezone.get_current_timezone()
+    Запоминает отметку синхронизации регистра ``name`` — время последней
+    записи в БД Джанго.
+    """
+    sync_entity = SYNC_ENTITIES[name]
+    high_water_mark = sync_entity["syncer"]["model"].objects.aggregate(
+        last=Max("period")
+    )["last"]
+    SyncState.objects.mark_synced(
+        sync_entity["request"]["odata_entity"], high_water_mark, full=since is None
     )
-    return object_odata
 
 
-def preproc_product_movement(object_odata: dict) -> dict:
-    object_odata = preproc_period(object_odata)
-    if object_odata["RecordType"] == "Expense":
-        object_odata["Количество"] *= -1
-    return object_odata
+def sync_entity_objects(
+    name: str,
+    objects_odata: Iterable[dict],
+    since: datetime | None,
+    onec_client: OneCODataClient | None = None,
+) -> str:
+    """
+    Синхронизирует объекты сущности ``name`` от 1с, запрошенные
+    по ``get_sync_request``.
+    """
+    if "register" not in SYNC_ENTITIES[name]:
+        syncer = get_syncer(name, objects_odata)
+        result = run_syncer(name, syncer, onec_client=onec_client)
+        if syncer.stats["deleted"]:
+            # Вместе со справочниками каскадно удаляются остатки и цены,
+            # минуя пересчёт, который обновляет кэш товаров
+            invalidate_products()
+        return result
+
+    syncer = get_syncer(name, objects_odata, scope=get_period_scope(since, None))
+    result = run_syncer(name, syncer, onec_client=onec_client)
+    mark_register_synced(name, since)
+    return result
+
+
+def sync_entity(name: str) -> str:
+    request, since = get_sync_request(name)
+    objects_odata = client.iter_entities_partitioned(**request)
+    return sync_entity_objects(name, objects_odata, since, onec_client=client)
 
 
 @app.task()
@@ -43,15 +385,7 @@ def sync_products() -> str:
     """
     Синхронизация данных по товарам.
     """
-    objects_odata: list[dict] = client.get(
-        "Catalog_Номенклатура", odata_filter="IsFolder eq false"
-    )["value"]
-    return ODataToDjangoDataSyncer(
-        model=Product,
-        objects_odata=objects_odata,
-        fields_mapping={"ref_key": "Ref_Key", "name": "Description", "sku": "Артикул"},
-        primary_key_name="Ref_Key",
-    ).sync_objects()
+    return sync_entity("products")
 
 
 @app.task()
@@ -60,13 +394,7 @@ def sync_price_types() -> str:
     Синхронизация данных по типам цен.
     """
 
-    objects_odata: list[dict] = client.get("Catalog_ВидыЦен")["value"]
-    return ODataToDjangoDataSyncer(
-        model=PriceType,
-        objects_odata=objects_odata,
-        fields_mapping={"ref_key": "Ref_Key", "name": "Description"},
-        primary_key_name="Ref_Key",
-    ).sync_objects()
+    return sync_entity("price_types")
 
 
 @app.task()
@@ -75,15 +403,7 @@ def sync_characteristics() -> str:
     Синхронизация данных по характеристикам товаров.
     """
 
-    objects_odata: list[dict] = client.get("Catalog_ХарактеристикиНоменклатуры")[
-        "value"
-    ]
-    return ODataToDjangoDataSyncer(
-        model=Characteristic,
-        objects_odata=objects_odata,
-        fields_mapping={"ref_key": "Ref_Key", "name": "Description"},
-        primary_key_name="Ref_Key",
-    ).sync_objects()
+    return sync_entity("characteristics")
 
 
 @app.task()
@@ -92,18 +412,7 @@ def sync_barcodes() -> str:
     Синхронизация данных по штрихкодам.
     """
 
-    objects_odata: list[dict] = client.get("InformationRegister_Штрихкоды")["value"]
-    fields_mapping = {
-        "barcode": "Штрихкод",
-        "product_id": "Владелец",
-        "characteristic_id": "Характеристика_Key",
-    }
-    return ODataToDjangoDataSyncer(
-        model=Barcode,
-        objects_odata=objects_odata,
-        fields_mapping=fields_mapping,
-        update=False,
-    ).sync_objects()
+    return sync_entity("barcodes")
 
 
 @app.task()
@@ -112,26 +421,7 @@ def sync_product_movements() -> str:
     Синхронизация данных по движениям товаров.
     """
 
-    objects_odata: list[dict] = client.get(
-        "AccumulationRegister_ТоварыНаСкладах",
-        odata_filter=(
-            "Recorder_Type eq 'StandardODATA.Document_ВозвратТоваровОтПокупателя'"
-        ),
-    )["value"]
-
-    return ODataToDjangoDataSyncer(
-        model=ProductMovement,
-        objects_odata=objects_odata,
-        fields_mapping={
-            "product_id": "Номенклатура_Key",
-            "characteristic_id": "Характеристика_Key",
-            "amount": "Количество",
-            "period": "Period",
-        },
-        preproc_function=preproc_product_movement,
-        nested_key="RecordSet",
-        update=False,
-    ).sync_objects()
+    return sync_entity("product_movements")
 
 
 @app.task()
@@ -140,21 +430,247 @@ def sync_price_changes() -> str:
     Синхронизация данных по изменениям цен товаров.
     """
 
-    objects_odata: list[dict] = client.get(
-        "InformationRegister_ЦеныНоменклатуры",
-    )["value"]
+    return sync_entity("price_changes")
 
-    return ODataToDjangoDataSyncer(
-        model=PriceChange,
-        objects_odata=objects_odata,
-        fields_mapping={
-            "product_id": "Номенклатура_Key",
-            "characteristic_id": "Характеристика_Key",
-            "price": "Цена",
-            "period": "Period",
-            "price_type_id": "ВидЦены_Key",
-        },
-        preproc_function=preproc_period,
-        nested_key="RecordSet",
-        update=False,
-    ).sync_objects()
+
+@app.task()
+def sync_register_shard(name: str, lower: str | None, upper: str | None) -> dict:
+    """
+    Синхронизация части записей регистра ``name`` с ``Period`` в промежутке
+    ``[lower, upper)`` (время в ISO 8601). Части одного регистра выполняются
+    параллельно на разных воркерах; ``finish_register_shards`` завершает
+    синхронизацию после всех частей.
+
+    Хэш данных для пропуска неизменившихся данных по частям не сохраняется:
+    границы частей сдвигаются при каждой синхронизации.
+    """
+    lower = datetime.fromisoformat(lower) if lower else None
+    upper = datetime.fromisoformat(upper) if upper else None
+    request = get_entity_request(name)
+    request["partition_filters"] = [get_period_filter(lower, upper)]
+    objects_odata = client.iter_entities_partitioned(**request)
+
+    kwargs = {"scope": get_period_scope(lower, upper), "state_entity": None}
+    product_ids = set()
+    if "shard_postproc" in SYNC_ENTITIES[name]["register"]:
+
+        def collect_product_ids(saved_objects, deleted_objects):
+            for obj in [*saved_objects, *deleted_objects]:
+                product_ids.add(str(obj.product_id))
+
+        kwargs["postproc_function"] = collect_product_ids
+
+    syncer = get_syncer(name, objects_odata, **kwargs)
+    result = run_syncer(name, syncer, onec_client=client)
+    return {"result": result, "product_ids": sorted(product_ids)}
+
+
+def finish_register_shards(
+    name: str, shard_results: list[dict], since: datetime | None
+) -> str:
+    """
+    Завершает синхронизацию регистра ``name`` по частям: постобработка,
+    которую нельзя выполнять одновременно в частях, и отметка синхронизации.
+    """
+    shard_postproc = SYNC_ENTITIES[name]["register"].get("shard_postproc")
+    if shard_postproc:
+        product_ids = {
+            uuid.UUID(product_id)
+            for shard_result in shard_results
+            for product_id in shard_result["product_ids"]
+        }
+        shard_postproc(product_ids, since)
+    mark_register_synced(name, since)
+    return "; ".join(shard_result["result"] for shard_result in shard_results)
+
+
+# Лок, который не даёт запустить синхронизацию всех данных (``sync_pipeline``
+# или ``sync_all``), пока идёт предыдущий запуск
+SYNC_PIPELINE_LOCK_KEY = "products:sync-pipeline:lock"
+
+# Справочники не зависят друг от друга и синхронизируются параллельно,
+# а штрихкоды и регистры ссылаются на них и синхронизируются после
+CATALOG_SYNC_TASKS = {
+    "products": sync_products,
+    "price_types": sync_price_types,
+    "characteristics": sync_characteristics,
+}
+DEPENDENT_SYNC_TASKS = {
+    "barcodes": sync_barcodes,
+    "product_movements": sync_product_movements,
+    "price_changes": sync_price_changes,
+}
+
+
+@app.task()
+def sync_pipeline() -> None:
+    """
+    Синхронизация всех данных с 1с с учётом зависимостей: параллельно
+    справочники, после них параллельно штрихкоды и регистры, в конце — снимок
+    выгрузки для мобильных клиентов и отчёт о времени синхронизации.
+
+    Если ``ONEC_SYNC_SHARDS`` больше 1, регистры синхронизируются по частям
+    (``sync_register_shard``), которые выполняются параллельно на разных
+    воркерах.
+
+    Одновременно выполняется только один запуск: пока держится лок,
+    следующие запуски пропускаются. Лок снимается в конце запуска или при
+    ошибке, а если воркер упал — истекает через ``SYNC_PIPELINE_LOCK_TIMEOUT``.
+    """
+    started_at = acquire_sync_pipeline_lock()
+    if started_at is None:
+        return
+    chord(
+        [task.si() for task in CATALOG_SYNC_TASKS.values()],
+        sync_dependent_entities.s(started_at),
+    ).on_error(release_sync_pipeline_lock.si(started_at)).apply_async()
+
+
+def acquire_sync_pipeline_lock() -> float | None:
+    """
+    Берёт лок ``SYNC_PIPELINE_LOCK_KEY``. Возвращает время начала запуска,
+    по которому ``release_sync_pipeline_lock`` снимает лок, или ``None``,
+    если идёт другой запуск.
+    """
+    started_at = time.time()
+    if not cache.add(
+        SYNC_PIPELINE_LOCK_KEY, started_at, timeout=settings.SYNC_PIPELINE_LOCK_TIMEOUT
+    ):
+        logger.info("Sync pipeline is already running, skipping")
+        return None
+    return started_at
+
+
+@app.task()
+def release_sync_pipeline_lock(started_at: float) -> None:
+    """
+    Снимает лок ``sync_pipeline``, если его взял запуск, начатый в ``started_at``:
+    истёкший лок мог взять следующий запуск.
+    """
+    if cache.get(SYNC_PIPELINE_LOCK_KEY) == started_at:
+        cache.delete(SYNC_PIPELINE_LOCK_KEY)
+
+
+@app.task()
+def sync_dependent_entities(catalog_results: list[str], started_at: float) -> None:
+    """
+    Второй этап ``sync_pipeline``: запускается после синхронизации справочников.
+    """
+    results = dict(zip(CATALOG_SYNC_TASKS.keys(), catalog_results))
+    logger.info("Catalogs synced in %.1fs: %s", time.time() - started_at, results)
+
+    # Таски второго этапа и, для каждой сущности, количество частей регистра
+    # (0 — сущность синхронизируется одной таской) и время, с которого
+    # синхронизируется регистр
+    header = []
+    layout = []
+    for name, task in DEPENDENT_SYNC_TASKS.items():
+        if "register" not in SYNC_ENTITIES[name] or settings.ONEC_SYNC_SHARDS < 2:
+            header.append(task.si())
+            layout.append((name, 0, None))
+            continue
+        since, shards = get_register_shards(name)
+        header.extend(
+            sync_register_shard.si(
+                name,
+                lower.isoformat() if lower else None,
+                upper.isoformat() if upper else None,
+            )
+            for lower, upper in shards
+        )
+        layout.append((name, len(shards), since.isoformat() if since else None))
+
+    chord(header, finish_sync_pipeline.s(results, started_at, layout)).on_error(
+        release_sync_pipeline_lock.si(started_at)
+    ).apply_async()
+
+
+@app.task()
+def finish_sync_pipeline(
+    dependent_results: list,
+    catalog_results: dict[str, str],
+    started_at: float,
+    layout: list[tuple[str, int, str | None]],
+) -> dict:
+    """
+    Последний этап ``sync_pipeline``: завершение синхронизации регистров
+    по частям, снимок выгрузки и отчёт о синхронизации.
+    """
+    results = dict(catalog_results)
+    position = 0
+    for name, shards_count, since in layout:
+        if not shards_count:
+            results[name] = dependent_results[position]
+            position += 1
+            continue
+        shards_end = position + shards_count
+        shard_results = dependent_results[position:shards_end]
+        position = shards_end
+        since = datetime.fromisoformat(since) if since else None
+        results[name] = finish_register_shards(name, shard_results, since)
+
+    snapshot_result = build_snapshot()
+    duration = time.time() - started_at
+    logger.info("Sync pipeline finished in %.1fs: %s", duration, results)
+    # Если этап завершился ошибкой, лок снимает обработчик ошибок chord
+    release_sync_pipeline_lock(started_at)
+    return {
+        "duration": round(duration, 3),
+        "results": results,
+        "snapshot": snapshot_result,
+    }
+
+
+async def fetch_entities(requests: dict[str, dict]) -> dict[str, list[dict]]:
+    """
+    Одновременно запрашивает у 1с объекты всех сущностей ``requests``.
+    """
+    async with AsyncOneCODataClient() as async_client:
+        entities = await asyncio.gather(
+            *[
+                async_client.get_entities_partitioned(**request)
+                for request in requests.values()
+            ]
+        )
+    return dict(zip(requests.keys(), entities))
+
+
+@app.task()
+def sync_all() -> dict[str, str]:
+    """
+    Синхронизация всех данных: объекты всех сущностей запрашиваются у 1с
+    одновременно, затем сохраняются по очереди в порядке зависимостей.
+
+    Все загруженные объекты держатся в памяти, поэтому для больших полных
+    сверок регистров подходят отдельные таски. Загрузка идёт до синхронизации,
+    поэтому в ``SyncRun`` время загрузки и объём данных не записываются.
+
+    Не выполняется одновременно с ``sync_pipeline``: оба берут один лок.
+    """
+    started_at = acquire_sync_pipeline_lock()
+    if started_at is None:
+        return {}
+    try:
+        requests = {}
+        since_by_name = {}
+        for name in SYNC_ENTITIES:
+            requests[name], since_by_name[name] = get_sync_request(name)
+
+        entities = asyncio.run(fetch_entities(requests))
+
+        results = {
+            name: sync_entity_objects(name, entities[name], since_by_name[name])
+            for name in SYNC_ENTITIES
+        }
+    finally:
+        release_sync_pipeline_lock(started_at)
+    build_sync_data_snapshot.delay()
+    return results
+
+
+@app.task()
+def build_sync_data_snapshot() -> str:
+    """
+    Построение сжатого снимка полной выгрузки данных для мобильных клиентов.
+    """
+    return build_snapshot()
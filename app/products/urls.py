@@ -9,7 +9,9 @@ urlpatterns = [
     path("price-changes", views.PriceChangeListView.as_view()),
     path("price-types", views.PriceTypeListView.as_view()),
     path("characteristics", views.CharacteristicListView.as_view()),
+    path("products/cache-stats", views.ProductCacheStatsView.as_view()),
     path("products/<str:pk>/amounts", views.ProductAmountsView.as_view()),
     path("products/<str:pk>/prices", views.ProductPricesView.as_view()),
     path("sync-data", views.SyncDataView.as_view()),
+    path("sync-runs", views.SyncRunListView.as_view()),
 ]
@@ -1,7 +1,11 @@
-from urllib import response
-
+from django.conf import settings
+from django.http import FileResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
 from drf_spectacular.utils import extend_schema
+from rest_framework import serializers
 from rest_framework.generics import GenericAPIView, ListAPIView
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
@@ -12,6 +16,14 @@ from .models import (
     PriceType,
     Product,
     ProductMovement,
+    SyncRun,
+    Tombstone,
+)
+from .pagination import (
+    IdCursorPagination,
+    PeriodCursorPagination,
+    RefKeyCursorPagination,
+    StartedAtCursorPagination,
 )
 from .serializers import (
     BarcodeSerializer,
@@ -19,67 +31,143 @@ from .serializers import (
     PriceChangeSerializer,
     PriceTypeSerializer,
     ProductAmountSerializer,
+    ProductCacheStatsSerializer,
     ProductMovementSerializer,
     ProductPriceSerializer,
+    ProductPricesQuerySerializer,
     ProductSerializer,
+    SyncDataQuerySerializer,
     SyncDataSerializer,
+    SyncRunSerializer,
 )
+from .product_cache import get_product_data, get_stats
+from .sync_data import SYNC_DATA_TABLES, get_snapshot, iter_sync_data_json
 
 
 class BarcodeListView(ListAPIView):
     queryset = Barcode.objects.all()
     serializer_class = BarcodeSerializer
+    pagination_class = IdCursorPagination
 
 
 class CharacteristicListView(ListAPIView):
     queryset = Characteristic.objects.all()
     serializer_class = CharacteristicSerializer
+    pagination_class = RefKeyCursorPagination
 
 
 class PriceChangeListView(ListAPIView):
     queryset = PriceChange.objects.all()
     serializer_class = PriceChangeSerializer
+    pagination_class = PeriodCursorPagination
 
 
 class PriceTypeListView(ListAPIView):
     queryset = PriceType.objects.all()
     serializer_class = PriceTypeSerializer
+    pagination_class = RefKeyCursorPagination
 
 
 class ProductMovementListView(ListAPIView):
     queryset = ProductMovement.objects.all()
     serializer_class = ProductMovementSerializer
+    pagination_class = PeriodCursorPagination
 
 
 class ProductListView(ListAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    pagination_class = RefKeyCursorPagination
+
+
+class SyncRunListView(ListAPIView):
+    """
+    Запуски синхронизации с 1с: время загрузки, разбора и записи,
+    объём полученных данных и количество изменённых объектов.
+    """
+
+    queryset = SyncRun.objects.all()
+    serializer_class = SyncRunSerializer
+    pagination_class = StartedAtCursorPagination
+    permission_classes = (IsAdminUser,)
+    filterset_fields = ("entity",)
 
 
+@extend_schema(parameters=[SyncDataQuerySerializer])
 class SyncDataView(APIView):
     """
-    Данные по всем таблицам
+    Данные по всем таблицам.
+
+    Без параметра ``since`` возвращаются все данные. С ``since``, равным курсору
+    из предыдущего ответа, возвращаются только созданные, изменённые и удалённые
+    с того момента объекты. Если курсор старше срока хранения записей об удалениях,
+    возвращаются все данные и ``full`` равен ``true``.
+
+    Полная выгрузка отдаётся из сжатого снимка, который строится после
+    синхронизации с 1с, и поддерживает ``If-None-Match``.
+
+    Объекты, удалённые каскадно вместе с родителем (например, движения удалённого
+    товара), в ``deleted`` не попадают: клиент удаляет их вместе с родителем.
     """
 
     serializer_class = SyncDataSerializer
 
-    def get(self, _):
-        resp_body = {
-            "barcodes": BarcodeSerializer(Barcode.objects.all(), many=True).data,
-            "characteristics": CharacteristicSerializer(
-                Characteristic.objects.all(), many=True
-            ).data,
-            "price_changes": PriceChangeSerializer(
-                PriceChange.objects.all(), many=True
-            ).data,
-            "price_types": PriceTypeSerializer(PriceType.objects.all(), many=True).data,
-            "product_movements": ProductMovementSerializer(
-                ProductMovement.objects.all(), many=True
-            ).data,
-            "products": ProductSerializer(Product.objects.all(), many=True).data,
-        }
+    def get(self, request):
+        query_serializer = SyncDataQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        since = query_serializer.validated_data.get("since")
+
+        cursor = timezone.now()
+        full = since is None or since < cursor - settings.SYNC_DATA_TOMBSTONES_TTL
+        cursor = serializers.DateTimeField().to_representation(cursor)
+        if full:
+            return self.get_full(request, cursor)
+
+        # Синхронизация с 1с может закоммитить объекты со временем обновления
+        # раньше выданного курсора, поэтому берём изменения с запасом
+        since -= settings.SYNC_DATA_CURSOR_OVERLAP
+
+        resp_body = {"cursor": cursor, "full": full, "deleted": {}}
+        for key, model, serializer_class in SYNC_DATA_TABLES:
+            queryset = model.objects.filter(updated_at__gte=since)
+            resp_body[key] = serializer_class(queryset, many=True).data
+            resp_body["deleted"][key] = []
+
+        model_keys = {model._meta.model_name: key for key, model, _ in SYNC_DATA_TABLES}
+        tombstones = Tombstone.objects.filter(
+            deleted_at__gte=since, model_name__in=model_keys.keys()
+        ).values_list("model_name", "object_id")
+        for model_name, object_id in tombstones:
+            resp_body["deleted"][model_keys[model_name]].append(object_id)
+
         return Response(resp_body)
 
+    def get_full(self, request, cursor: str):
+        snapshot = get_snapshot()
+        if snapshot is None or "gzip" not in request.headers.get("Accept-Encoding", ""):
+            # Полная выгрузка отдаётся потоком, не собирая весь ответ в памяти
+            return StreamingHttpResponse(
+                iter_sync_data_json(cursor), content_type="application/json"
+            )
+
+        etag = quote_etag(snapshot["etag"])
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            response = HttpResponseNotModified()
+        else:
+            try:
+                snapshot_file = open(snapshot["path"], "rb")
+            except FileNotFoundError:
+                # Снимок заменили новым, пока мы читали его описание
+                return StreamingHttpResponse(
+                    iter_sync_data_json(cursor), content_type="application/json"
+                )
+            response = FileResponse(snapshot_file, content_type="application/json")
+            response["Content-Encoding"] = "gzip"
+        response["ETag"] = etag
+        response["Vary"] = "Accept-Encoding"
+        return response
+
 
 @extend_schema(responses=ProductAmountSerializer(many=True))
 class ProductAmountsView(GenericAPIView):
@@ -88,14 +176,39 @@ class ProductAmountsView(GenericAPIView):
 
     def get(self, _, *args, **kwargs):
         product: Product = self.get_object()
-        return Response(product.get_amounts())
+        return Response(get_product_data(product.pk, "amounts", product.get_amounts))
 
 
-@extend_schema(responses=ProductPriceSerializer(many=True))
+@extend_schema(
+    parameters=[ProductPricesQuerySerializer],
+    responses=ProductPriceSerializer(many=True),
+)
 class ProductPricesView(GenericAPIView):
     queryset = Product.objects.all()
     pagination_class = None
 
-    def get(self, _, *args, **kwargs):
+    def get(self, request, *args, **kwargs):
+        query_serializer = ProductPricesQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
         product: Product = self.get_object()
-        return Response(product.get_prices())
+        price_type = query_serializer.validated_data.get("price_type")
+        return Response(
+            get_product_data(
+                product.pk,
+                "prices",
+                lambda: product.get_prices(price_type),
+                price_type,
+            )
+        )
+
+
+@extend_schema(responses=ProductCacheStatsSerializer)
+class ProductCacheStatsView(APIView):
+    """
+    Количество попаданий в кэш остатков и цен товаров и промахов.
+    """
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, _):
+        return Response(get_stats())